@@ -0,0 +1,109 @@
+# benchmarks/bench_ann_index.py
+#
+# Recall@k and latency of the ANN index types against the exact flat baseline:
+#     python -m benchmarks.bench_ann_index                 # vectors of the saved index
+#     python -m benchmarks.bench_ann_index 200000          # synthetic clustered vectors of that count
+#
+# Queries are stored vectors plus noise, so every query has close neighbours as real questions do.
+
+from typing import List, Tuple
+import time
+import sys
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+from core.index_factory import build_index, reconstruct_all, index_type
+from core.vector_store import VectorStoreManager
+
+
+K = 10
+QUERIES = 500
+SWEEPS = {
+    "flat": [("-", None)],
+    "ivf_flat": [("nprobe", n) for n in (1, 4, 16, 64)],
+    "hnsw": [("efSearch", n) for n in (16, 64, 256)],
+    "ivf_pq": [("nprobe", n) for n in (4, 16, 64)],
+}
+
+
+def corpus(count: int) -> np.ndarray:
+    """
+    Loads the stored vectors, or generates clustered unit vectors shaped like sentence embeddings
+
+    Args:
+          count: Number of synthetic vectors, 0 for the saved index
+    Returns:
+          Float32 array of shape (n, dimension)
+    """
+    if not count:
+        manager = VectorStoreManager()
+        manager.load()
+        return reconstruct_all(manager.vector_store.index)
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(count // 100, 1), 384)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.6 * rng.standard_normal((count, 384)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Searches one query at a time, as the app does
+
+    Args:
+          index: FAISS index
+          queries: Query vectors
+    Returns:
+          Tuple of (result positions, mean milliseconds per query)
+    """
+    results: List[np.ndarray] = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(index.search(query[None, :], K)[1][0])
+    return np.array(results), (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main() -> None:
+    """
+    Builds every index type over the same vectors and prints recall@k, latency and size
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    vectors = corpus(count)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), min(QUERIES, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={K}")
+    print(f"{'index':<9} {'param':>14} {'build s':>8} {'MB':>8} {f'recall@{K}':>10} {'ms/query':>9}")
+    truth = None
+    for kind, sweep in SWEEPS.items():
+        start = time.perf_counter()
+        index = build_index(vectors, kind)
+        build_s = time.perf_counter() - start
+        if index_type(index) != kind:
+            continue
+        size_mb = faiss.serialize_index(index).nbytes / 2**20
+
+        for name, value in sweep:
+            if name == "nprobe":
+                faiss.extract_index_ivf(index).nprobe = value
+            elif name == "efSearch":
+                faiss.downcast_index(index).hnsw.efSearch = value
+            found, ms = timed_search(index, queries)
+            if truth is None:
+                truth = found
+            recall = np.mean([len(set(a) & set(b)) / K for a, b in zip(found, truth)])
+            param = "-" if value is None else f"{name}={value}"
+            print(f"{kind:<9} {param:>14} {build_s:>8.2f} {size_mb:>8.1f} {recall:>10.3f} {ms:>9.3f}")
+
+    print(f"\nConfigured: FAISS_INDEX_TYPE={settings.FAISS_INDEX_TYPE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_embedding_backend.py
+#
+# Parity and latency of the embedding backends on chunks of the PDFs in data/raw_pdf:
+#     python -m benchmarks.bench_embedding_backend [quantization config, default avx2]
+#
+# Needs the ONNX extras: pip install "sentence-transformers[onnx]"
+
+from pathlib import Path
+from typing import List
+import statistics
+import time
+import sys
+
+import numpy as np
+
+from core.document_processing import DocumentProcessor
+from core.chunking import Chunking
+from core.embedding import EmbeddingManager
+
+
+RAW_PDF_DIR = Path("data/raw_pdf")
+QUERIES = [
+    "What is the attention mechanism?",
+    "How is the model pre-trained?",
+    "Which datasets are used for evaluation?",
+    "What are the limitations of the approach?",
+    "How does chain of thought prompting work?",
+]
+QUERY_REPEATS = 20
+
+
+def corpus_chunks() -> List[str]:
+    """
+    Chunks every PDF the way ingestion does
+
+    Args:
+          No arguments
+    Returns:
+          List of chunk texts
+    """
+    texts = []
+    for pdf_path in sorted(RAW_PDF_DIR.glob("*.pdf")):
+        documents = DocumentProcessor(path=str(pdf_path)).process()
+        texts.extend(chunk.page_content for chunk in Chunking(documents).intiate_chunk())
+    return texts
+
+
+def query_latency_ms(manager: EmbeddingManager) -> float:
+    """
+    Median latency of embedding a single query, bypassing any cache
+
+    Args:
+          manager: EmbeddingManager to time
+    Returns:
+          Median latency in milliseconds
+    """
+    manager._embedding.embed_query(QUERIES[0])
+    timings = []
+    for _ in range(QUERY_REPEATS):
+        for query in QUERIES:
+            start = time.perf_counter()
+            manager._embedding.embed_query(query)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    """
+    Embeds the corpus with every backend and prints cosine parity against PyTorch and latency
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    quantize = sys.argv[1] if len(sys.argv) > 1 else "avx2"
+    texts = corpus_chunks()
+    print(f"{len(texts)} chunks")
+
+    reference = None
+    print(f"{'backend':<22} {'min cos':>8} {'mean cos':>9} {'query ms':>9} {'chunks/s':>9}")
+    for backend, quant in (("torch", ""), ("onnx", ""), ("onnx", quantize)):
+        manager = EmbeddingManager(backend=backend, quantize=quant)
+        manager.embed_batch(texts[:manager.batch_size])
+
+        start = time.perf_counter()
+        vectors = manager.embed_batch(texts)
+        rate = len(texts) / (time.perf_counter() - start)
+        if reference is None:
+            reference = vectors
+        # Vectors are L2-normalized, so the row-wise dot product is the cosine similarity
+        cosine = np.einsum("ij,ij->i", reference, vectors)
+
+        print(
+            f"{manager.backend_tag:<22} {cosine.min():>8.4f} {cosine.mean():>9.4f} "
+            f"{query_latency_ms(manager):>9.2f} {rate:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
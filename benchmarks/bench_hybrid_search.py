@@ -0,0 +1,82 @@
+# benchmarks/bench_hybrid_search.py
+#
+# Known-item recall of dense, BM25 and fused (reciprocal rank fusion) retrieval on the saved index:
+#     python -m benchmarks.bench_hybrid_search [number of queries, default 200]
+#
+# Each query is the three rarest terms of a sampled chunk, the way a researcher searches for a model
+# or dataset name; a hit means that chunk is among the top k results.
+
+from collections import Counter
+from typing import List, Tuple
+import time
+import sys
+
+import numpy as np
+
+from config.settings import settings
+from core.bm25_index import reciprocal_rank_fusion, tokenize
+from core.vector_store import VectorStoreManager
+
+
+def known_items(manager: VectorStoreManager, count: int) -> List[Tuple[str, str]]:
+    """
+    Samples chunks and builds a query from the rarest terms of each
+
+    Args:
+          manager: Loaded vector store with a keyword index
+          count: Number of queries
+    Returns:
+          List of (docstore id, query) pairs
+    """
+    keywords = manager.keyword_index
+    frequency = dict(zip(keywords.terms, np.diff(keywords.indptr)))
+    rng = np.random.default_rng(0)
+    items = []
+    for row in rng.choice(len(keywords), size=min(count, len(keywords)), replace=False):
+        _id = keywords.ids[row]
+        terms = Counter(tokenize(manager.vector_store.docstore.search(_id).page_content))
+        rare = sorted(terms, key=frequency.get)
+        if rare:
+            items.append((_id, " ".join(rare[:3])))
+    return items
+
+
+def main() -> None:
+    """
+    Measures hit rate at k and latency of each retrieval mode
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    k = settings.TOP_K_RESULTS
+
+    manager = VectorStoreManager()
+    manager.load()
+    if manager.keyword_index is None:
+        manager.build_keyword_index()
+    items = known_items(manager, count)
+
+    hits = Counter()
+    elapsed = Counter()
+    for _id, query in items:
+        start = time.perf_counter()
+        dense = [doc for doc, _ in manager.search_with_scores(query, k=k)]
+        elapsed["dense"] += time.perf_counter() - start
+        start = time.perf_counter()
+        keyword = [doc for doc, _ in manager.keyword_search(query, k=k)]
+        elapsed["bm25"] += time.perf_counter() - start
+        fused = reciprocal_rank_fusion([dense, keyword], k)
+        for mode, documents in (("dense", dense), ("bm25", keyword), ("fused", fused)):
+            hits[mode] += any(doc.id == _id for doc in documents)
+
+    print(f"{len(items)} known-item queries, k={k}, {len(manager.keyword_index)} chunks")
+    for mode in ("dense", "bm25", "fused"):
+        latency = f"{elapsed[mode] / len(items) * 1000:.2f} ms/query" if mode in elapsed else ""
+        print(f"{mode:<6} hit@{k} {hits[mode] / len(items):.3f}  {latency}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_index_load.py
+#
+# Load time and resident memory of the saved index, read into the heap vs. memory-mapped:
+#     python -m benchmarks.bench_index_load [index dir, default FAISS_INDEX_PATH] [processes, default 4]
+#
+# Mapped pages show up as RssFile and are shared by every process on the host; RssAnon is private.
+
+from multiprocessing import get_context
+from typing import Dict
+import time
+import sys
+
+import numpy as np
+
+from config.settings import settings
+from core.vector_store import VectorStoreManager
+
+
+SEARCHES = 200
+
+
+def rss() -> Dict[str, int]:
+    """
+    Reads the resident set of the current process
+
+    Args:
+          No arguments
+    Returns:
+          Dictionary of VmRSS, RssAnon and RssFile in kB
+    """
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(value.split()[0])
+    return values
+
+
+def measure(path: str, mmap: bool) -> Dict:
+    """
+    Loads the index in a fresh process and searches it with random vectors
+
+    Args:
+          path: Index directory
+          mmap: Whether to memory-map index.faiss
+    Returns:
+          Dictionary of load time and memory deltas in kB
+    """
+    before = rss()
+    manager = VectorStoreManager()
+    start = time.perf_counter()
+    manager.load(path, mmap=mmap)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    index = manager.vector_store.index
+    queries = np.random.default_rng(0).random((SEARCHES, index.d), dtype=np.float32)
+    for query in queries:
+        index.search(query[None, :], settings.TOP_K_RESULTS)
+
+    after = rss()
+    return {
+        "load_ms": load_ms,
+        "vectors": index.ntotal,
+        **{key: after[key] - before[key] for key in after},
+    }
+
+
+def main() -> None:
+    """
+    Runs every mode in several worker processes and prints per-process memory
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    path = sys.argv[1] if len(sys.argv) > 1 else settings._FAISS_INDEX_PATH
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    context = get_context("spawn")
+
+    print(f"{'mode':<6} {'vectors':>9} {'load ms':>9} {'RSS kB':>9} {'anon kB':>9} {'file kB':>9}")
+    for mmap in (False, True):
+        with context.Pool(processes) as pool:
+            results = pool.starmap(measure, [(path, mmap)] * processes)
+        for result in results:
+            print(
+                f"{'mmap' if mmap else 'heap':<6} {result['vectors']:>9} {result['load_ms']:>9.1f} "
+                f"{result['VmRSS']:>9} {result['RssAnon']:>9} {result['RssFile']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_reranker.py
+#
+# Per-stage latency of two-stage retrieval and the context it sends to the LLM, on the saved index:
+#     python -m benchmarks.bench_reranker [number of queries, default 64]
+#
+# Compares the plain top TOP_K_RESULTS chunks with RERANK_TOP_N chunks reranked out of
+# RERANK_CANDIDATES, at several time budgets. Context size is counted with the embedding tokenizer.
+
+from typing import List
+import sys
+
+import numpy as np
+
+from config.settings import settings
+from core.chain import RAGChain
+from core.reranker import CrossEncoderReranker
+from core.vector_store import VectorStoreManager
+from benchmarks.bench_search_many import queries
+
+
+BUDGETS_MS = (50, 150, 300, 1000)
+
+
+def context_tokens(manager: VectorStoreManager, documents: List) -> int:
+    """
+    Counts the tokens of the chunks that would go into the prompt
+
+    Args:
+          manager: Vector store whose embedding tokenizer is used
+          documents: Retrieved documents
+    Returns:
+          Number of tokens
+    """
+    return sum(manager.embedding_manager.token_length(doc.page_content) for doc in documents)
+
+
+def main() -> None:
+    """
+    Runs the questions without and with reranking and prints latency percentiles and context size
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    questions = queries(count)
+
+    manager = VectorStoreManager()
+    manager.load()
+    chain = RAGChain(manager)
+    chain.reranker = None
+    chain.retrieve(questions[0])
+
+    retrieve_ms, tokens = [], []
+    for question in questions:
+        documents, timings = chain.retrieve_with_timings(question)
+        retrieve_ms.append(timings["retrieve_ms"])
+        tokens.append(context_tokens(manager, documents))
+    print(f"{count} queries, {manager.vector_store.index.ntotal} chunks, reranker {settings.RERANK_MODEL}")
+    print(
+        f"single stage top {settings.TOP_K_RESULTS}: retrieval p50 {np.percentile(retrieve_ms, 50):.1f} ms, "
+        f"context {np.mean(tokens):.0f} tokens"
+    )
+
+    for budget in BUDGETS_MS:
+        chain.reranker = CrossEncoderReranker(time_budget_ms=budget)
+        chain.retrieve(questions[0])
+        retrieve_ms, rerank_ms, scored, tokens = [], [], [], []
+        for question in questions:
+            documents, timings = chain.retrieve_with_timings(question)
+            retrieve_ms.append(timings["retrieve_ms"])
+            rerank_ms.append(timings["rerank_ms"])
+            scored.append(timings["rerank_scored"] / max(timings["rerank_candidates"], 1))
+            tokens.append(context_tokens(manager, documents))
+        print(
+            f"rerank budget {budget:>5} ms: retrieval p50 {np.percentile(retrieve_ms, 50):.1f} ms, "
+            f"rerank p50 {np.percentile(rerank_ms, 50):.1f} / p95 {np.percentile(rerank_ms, 95):.1f} ms, "
+            f"{np.mean(scored):.0%} of candidates scored, context {np.mean(tokens):.0f} tokens"
+        )
+
+
+if __name__ == "__main__":
+    main()
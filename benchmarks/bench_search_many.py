@@ -0,0 +1,82 @@
+# benchmarks/bench_search_many.py
+#
+# Throughput of VectorStoreManager.search_many against a loop over search, on the saved index:
+#     python -m benchmarks.bench_search_many [number of queries, default 256]
+#
+# The query cache is cleared before each run so both paths pay for embedding.
+
+from itertools import product
+from typing import List
+import time
+import sys
+
+from config.settings import settings
+from core.vector_store import VectorStoreManager
+
+
+TEMPLATES = [
+    "What is {}?",
+    "How does {} work?",
+    "Which results are reported for {}?",
+    "What are the limitations of {}?",
+]
+TOPICS = [
+    "self-attention", "masked language modeling", "next sentence prediction", "permutation language modeling",
+    "vision transformers", "patch embeddings", "chain of thought prompting", "few-shot learning",
+    "zero-shot task transfer", "scaling laws", "positional encoding", "layer normalization",
+    "diffusion decoding", "speculative decoding", "byte pair encoding", "instruction tuning",
+]
+
+
+def queries(count: int) -> List[str]:
+    """
+    Builds distinct evaluation-style questions
+
+    Args:
+          count: Number of questions
+    Returns:
+          List of question strings
+    """
+    questions = [template.format(topic) for template, topic in product(TEMPLATES, TOPICS)]
+    return [f"{questions[i % len(questions)]} ({i // len(questions)})" if i >= len(questions) else questions[i]
+            for i in range(count)]
+
+
+def main() -> None:
+    """
+    Times both paths on the same questions and checks they return the same chunks
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    k = settings.TOP_K_RESULTS
+    questions = queries(count)
+
+    manager = VectorStoreManager()
+    manager.load()
+    manager.search(questions[0], k=k)
+
+    manager.embedding_manager.query_cache.clear()
+    start = time.perf_counter()
+    looped = [manager.search(question, k=k) for question in questions]
+    loop_s = time.perf_counter() - start
+
+    manager.embedding_manager.query_cache.clear()
+    start = time.perf_counter()
+    batched = manager.search_many(questions, k=k)
+    batch_s = time.perf_counter() - start
+
+    overlap = sum(
+        len({doc.id for doc in a} & {doc.id for doc, _ in b}) for a, b in zip(looped, batched)
+    ) / (len(questions) * k)
+    print(f"{count} queries, k={k}, {manager.vector_store.index.ntotal} vectors")
+    print(f"loop over search: {loop_s:.3f}s ({count / loop_s:.1f} queries/s)")
+    print(f"search_many:      {batch_s:.3f}s ({count / batch_s:.1f} queries/s)")
+    print(f"speedup {loop_s / batch_s:.1f}x, result overlap {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
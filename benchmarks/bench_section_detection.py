@@ -0,0 +1,86 @@
+# benchmarks/bench_section_detection.py
+#
+# Micro-benchmark of section detection on the PDFs in data/raw_pdf:
+#     python -m benchmarks.bench_section_detection
+
+from pathlib import Path
+from typing import List, Dict
+import time
+
+from core.document_processing import DocumentProcessor
+from core.section_detection import SectionDetector, SECTION_PATTERNS, TITLE_SECTION
+
+
+RAW_PDF_DIR = Path("data/raw_pdf")
+REPEATS = 20
+
+
+def legacy_section_info(text_list: List[str]) -> Dict:
+    """
+    The previous DocumentProcessor._section_info, kept verbatim for comparison
+
+    Args:
+          text_list: List of string tokens representing the document text
+    Returns:
+          Dictionary mapping section names to their starting indices
+    """
+    curr_pos = 0
+    page_dict = dict()
+    page_dict[TITLE_SECTION] = 0
+    for key,value in SECTION_PATTERNS.items():
+        for pattern in value:
+            if pattern in text_list[curr_pos:]:
+                if pattern not in page_dict.keys():
+                    page_dict[pattern]=curr_pos+text_list[curr_pos:].index(pattern)
+                    curr_pos = page_dict[pattern]
+                    break
+    return page_dict
+
+
+def best_of(fn, *args) -> float:
+    """
+    Runs a function REPEATS times and returns the fastest wall time
+
+    Args:
+          fn: Function to time
+          args: Arguments passed to the function
+    Returns:
+          Fastest run in milliseconds
+    """
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    """
+    Times legacy and one-pass detection per PDF and prints a comparison table
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    detector = SectionDetector()
+    corpus = {
+        pdf_path.name: DocumentProcessor(path=str(pdf_path)).parse().text
+        for pdf_path in sorted(RAW_PDF_DIR.glob("*.pdf"))
+    }
+    # A proceedings-sized volume: every paper back to back
+    corpus["<all papers concatenated>"] = " ".join(corpus.values())
+
+    print(f"{'paper':<55} {'tokens':>8} {'legacy ms':>10} {'one-pass ms':>12} {'sections':>9}")
+    for name, text in corpus.items():
+        tokens = text.split(" ")
+        legacy_ms = best_of(legacy_section_info, tokens)
+        new_ms = best_of(detector.detect, tokens, text)
+
+        sections = f"{len(legacy_section_info(tokens))}->{len(detector.detect(tokens, text))}"
+        print(f"{name[:55]:<55} {len(tokens):>8} {legacy_ms:>10.2f} {new_ms:>12.2f} {sections:>9}")
+
+
+if __name__ == "__main__":
+    main()
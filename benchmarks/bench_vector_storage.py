@@ -0,0 +1,102 @@
+# benchmarks/bench_vector_storage.py
+#
+# Memory and recall of float32 / float16 / int8 vector storage on the saved index:
+#     python -m benchmarks.bench_vector_storage [number of queries, default 200]
+#
+# Queries are stored vectors with a little noise; recall@k is measured against an exact float32
+# scan, with and without re-scoring the candidates on the exact vectors.
+
+from typing import List
+import time
+import sys
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+from core.index_factory import STORAGE_TYPES, build_index, reconstruct_all, search_parameters
+from core.vector_store import VectorStoreManager
+
+
+KINDS = ("flat", "hnsw")
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Share of the true nearest neighbours that were found
+
+    Args:
+          found: Positions returned per query, shape (queries, k)
+          truth: Exact nearest positions per query, shape (queries, k)
+    Returns:
+          Mean recall@k
+    """
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def rescore(vectors: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """
+    Re-ranks candidates by their exact squared L2 distance
+
+    Args:
+          vectors: Exact stored vectors
+          queries: Query vectors
+          candidates: Candidate positions per query
+          k: Number of positions to keep per query
+    Returns:
+          Top k positions per query
+    """
+    top: List[np.ndarray] = []
+    for query, positions in zip(queries, candidates):
+        positions = positions[positions != -1]
+        distances = ((vectors[positions] - query) ** 2).sum(axis=1)
+        top.append(positions[np.argsort(distances, kind="stable")[:k]])
+    return np.array(top)
+
+
+def main() -> None:
+    """
+    Builds each index kind at each storage precision and reports size, latency and recall
+
+    Args:
+          No arguments
+    Returns:
+          None
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    k = settings.TOP_K_RESULTS
+    factor = max(settings.FAISS_RESCORE_FACTOR, 1)
+
+    manager = VectorStoreManager()
+    manager.load()
+    vectors = np.ascontiguousarray(reconstruct_all(manager.vector_store.index), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(0, 0.01, size=(len(picks), vectors.shape[1])).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, k={k}, rescore factor {factor}")
+    print(f"{'index':<16}{'MB':>8}{'vs float32':>12}{'ms/query':>10}{'recall':>8}{'rescored':>10}")
+
+    for kind in KINDS:
+        baseline = None
+        for storage in STORAGE_TYPES:
+            index = build_index(vectors, kind, storage)
+            size = len(faiss.serialize_index(index))
+            baseline = baseline or size
+            params = search_parameters(index)
+            start = time.perf_counter()
+            _, found = index.search(queries, k, params=params)
+            elapsed = (time.perf_counter() - start) / len(queries) * 1000
+            _, candidates = index.search(queries, k * factor, params=params)
+            rescored = rescore(vectors, queries, candidates, k)
+            print(
+                f"{kind + '/' + storage:<16}{size / 2 ** 20:>8.2f}{size / baseline:>12.0%}{elapsed:>10.3f}"
+                f"{recall(found, truth):>8.3f}{recall(rescored, truth):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,96 @@ class Settings:
     EMBEDDING_MODEL:str = os.getenv("EMBEDDING_MODEL")
     CHUNK_SIZE:int=int(os.getenv("CHUNK_SIZE"))
     CHUNK_OVERLAP:int=int(os.getenv("CHUNK_OVERLAP"))
+    CHUNK_UNIT:str=os.getenv("CHUNK_UNIT", "chars")
+    CHUNK_TOKEN_SIZE:int=int(os.getenv("CHUNK_TOKEN_SIZE", "0"))
+    CHUNK_TOKEN_OVERLAP:int=int(os.getenv("CHUNK_TOKEN_OVERLAP", "32"))
+    CHUNK_TRUNCATION_CHECK:bool=os.getenv("CHUNK_TRUNCATION_CHECK", "false").lower() == "true"
     TOP_K_RESULTS:int=int(os.getenv("TOP_K_RESULTS"))
     GPT_MODEL_NAME:str=str(os.getenv("GPT_MODEL_NAME"))
     GROQ_API_KEY:str=str(os.getenv("GROQ_API_KEY"))
     TEMPRATURE:int=int(os.getenv("TEMPRATURE"))
     TAVILY_API_KEY:str=str(os.getenv("TAVILY_API_KEY"))
     METADATA_FILE:str=str(os.getenv("METADATA_FILE"))
+    PRESERVE_LAYOUT:bool=os.getenv("PRESERVE_LAYOUT", "false").lower() == "true"
+
+    # Embedding backend
+    EMBEDDING_BACKEND:str=os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_QUANTIZE:str=os.getenv("EMBEDDING_ONNX_QUANTIZE", "")
+    EMBEDDING_ONNX_DIR:str=os.getenv("EMBEDDING_ONNX_DIR", "data/onnx_models")
+
+    # Batch embedding
+    EMBED_BATCH_SIZE:int=int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    EMBED_NUM_THREADS:int=int(os.getenv("EMBED_NUM_THREADS", "0"))
+    EMBED_NUM_WORKERS:int=int(os.getenv("EMBED_NUM_WORKERS", "0"))
+
+    # Embedding cache
+    EMBEDDING_CACHE_ENABLED:bool=os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH:str=os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache/embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_MB:int=int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+    # Index storage
+    ALLOW_PICKLE_INDEX:bool=os.getenv("ALLOW_PICKLE_INDEX", "false").lower() == "true"
+    FAISS_MMAP:bool=os.getenv("FAISS_MMAP", "false").lower() == "true"
+    # Versions kept under <index>/versions, and seconds between app checks for a new one (0 disables)
+    INDEX_VERSIONS_KEEP:int=int(os.getenv("INDEX_VERSIONS_KEEP", "3"))
+    INDEX_RELOAD_INTERVAL:float=float(os.getenv("INDEX_RELOAD_INTERVAL", "30"))
+
+    # ANN index
+    FAISS_INDEX_TYPE:str=os.getenv("FAISS_INDEX_TYPE", "flat")
+    FAISS_NLIST:int=int(os.getenv("FAISS_NLIST", "0"))
+    FAISS_NPROBE:int=int(os.getenv("FAISS_NPROBE", "16"))
+    FAISS_HNSW_M:int=int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_HNSW_EF_CONSTRUCTION:int=int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+    FAISS_HNSW_EF_SEARCH:int=int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+    FAISS_PQ_M:int=int(os.getenv("FAISS_PQ_M", "0"))
+    FAISS_PQ_NBITS:int=int(os.getenv("FAISS_PQ_NBITS", "8"))
+    FILTER_EXACT_MAX:int=int(os.getenv("FILTER_EXACT_MAX", "20000"))
+    # Vector precision in the index (float32 | float16 | int8); with reduced precision, searches fetch
+    # k * FAISS_RESCORE_FACTOR candidates and re-rank them on the exact vectors (0 disables)
+    FAISS_STORAGE:str=os.getenv("FAISS_STORAGE", "float32")
+    FAISS_RESCORE_FACTOR:int=int(os.getenv("FAISS_RESCORE_FACTOR", "4"))
+
+    # Deletes: share of tombstoned vectors that triggers a background compaction (0 disables)
+    COMPACTION_THRESHOLD:float=float(os.getenv("COMPACTION_THRESHOLD", "0.1"))
+
+    # Sharding: partition key (venue | year | paper_id, empty for a single index), year bucket width,
+    # number of paper_id hash buckets and search threads (0 = one per CPU)
+    SHARD_KEY:str=os.getenv("SHARD_KEY", "")
+    SHARD_YEAR_BUCKET:int=int(os.getenv("SHARD_YEAR_BUCKET", "5"))
+    SHARD_COUNT:int=int(os.getenv("SHARD_COUNT", "8"))
+    SHARD_SEARCH_THREADS:int=int(os.getenv("SHARD_SEARCH_THREADS", "0"))
+
+    # Query embedding cache
+    QUERY_CACHE_SIZE:int=int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+    # Retrieval: minimum cosine similarity (0 disables) and maximal marginal relevance re-selection
+    RETRIEVAL_MIN_SCORE:float=float(os.getenv("RETRIEVAL_MIN_SCORE", "0"))
+    RETRIEVAL_MMR:bool=os.getenv("RETRIEVAL_MMR", "false").lower() == "true"
+    RETRIEVAL_FETCH_K:int=int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+    RETRIEVAL_MMR_LAMBDA:float=float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5"))
+    # Keyword search: BM25 index saved with the vector index, fused with dense hits by reciprocal rank
+    HYBRID_SEARCH:bool=os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    BM25_K1:float=float(os.getenv("BM25_K1", "1.2"))
+    BM25_B:float=float(os.getenv("BM25_B", "0.75"))
+    RRF_K:int=int(os.getenv("RRF_K", "60"))
+    # Reranking: a local cross-encoder re-scores up to RERANK_CANDIDATES first-stage hits within
+    # RERANK_TIME_BUDGET_MS and keeps the best RERANK_TOP_N for the prompt
+    RERANK_ENABLED:bool=os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL:str=os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES:int=int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_TOP_N:int=int(os.getenv("RERANK_TOP_N", "3"))
+    RERANK_TIME_BUDGET_MS:float=float(os.getenv("RERANK_TIME_BUDGET_MS", "300"))
+    RERANK_BATCH_SIZE:int=int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    RERANK_MAX_LENGTH:int=int(os.getenv("RERANK_MAX_LENGTH", "256"))
+
+    # Ingestion pipeline
+    INGEST_PARSE_WORKERS:int=int(os.getenv("INGEST_PARSE_WORKERS", os.cpu_count() or 1))
+    INGEST_META_WORKERS:int=int(os.getenv("INGEST_META_WORKERS", "4"))
+    INGEST_EMBED_BATCH:int=int(os.getenv("INGEST_EMBED_BATCH", "512"))
+    INGEST_QUEUE_SIZE:int=int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+    INGEST_STREAMING_PARSE:bool=os.getenv("INGEST_STREAMING_PARSE", "false").lower() == "true"
+    DEDUP_ENABLED:bool=os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD:float=float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+    INGEST_MANIFEST_FILE:str=str(os.getenv("INGEST_MANIFEST_FILE", "data/metadata/ingest_manifest.json"))
 
 settings = Settings()
\ No newline at end of file
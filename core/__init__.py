@@ -1,9 +1,11 @@
-from core.document_processing import DocumentProcessor
+from core.document_processing import DocumentProcessor, ParsedDocument
 from core.embedding import EmbeddingManager
 from core.meta_extraction import MetaExtraction
 from core.chunking import Chunking
 from core.structure import ResearchPaper
 from core.chain import RAGChain
 from core.vector_store import VectorStoreManager
+from core.sharded_store import ShardedVectorStore
+from core.ingestion import IngestionPipeline
 
-__all__ = ["DocumentProcessor", "MetaExtraction","Chunking","ResearchPaper","EmbeddingManager","RAGChain","VectorStoreManager"]
\ No newline at end of file
+__all__ = ["DocumentProcessor","ParsedDocument", "MetaExtraction","Chunking","ResearchPaper","EmbeddingManager","RAGChain","VectorStoreManager","ShardedVectorStore","IngestionPipeline"]
\ No newline at end of file
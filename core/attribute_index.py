@@ -0,0 +1,135 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+from collections import defaultdict
+
+import numpy as np
+
+
+ATTRIBUTE_FIELDS = ("title", "paper_id", "year", "venue", "section")
+
+
+class AttributeIndex:
+    """
+    Maps each value of selected metadata fields to a packed bitmap of the vector positions carrying
+    it, so a metadata filter resolves to candidate positions before any vector is compared
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = ATTRIBUTE_FIELDS):
+        """
+        Initializes an empty index
+
+        Args:
+              fields: Metadata fields to index
+        Returns:
+              None
+        """
+        self.fields = fields
+        self.size = 0
+        self._bitmaps: Dict[str, Dict[Any, np.ndarray]] = {field: {} for field in fields}
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[int, Dict]], size: int, fields: Tuple[str, ...] = ATTRIBUTE_FIELDS) -> "AttributeIndex":
+        """
+        Builds the bitmaps from the metadata of every stored vector
+
+        Args:
+              entries: (position, metadata) pairs
+              size: Number of vectors in the index
+              fields: Metadata fields to index
+        Returns:
+              AttributeIndex instance
+        """
+        index = cls(fields)
+        index.size = size
+        positions: Dict[str, Dict[Any, list]] = {field: defaultdict(list) for field in fields}
+        for position, metadata in entries:
+            for field in fields:
+                value = metadata.get(field)
+                if value is not None and isinstance(value, (str, int, float, bool)):
+                    positions[field][value].append(position)
+
+        for field, values in positions.items():
+            for value, hits in values.items():
+                bits = np.zeros(size, dtype=bool)
+                bits[hits] = True
+                index._bitmaps[field][value] = np.packbits(bits)
+        return index
+
+    def supports(self, metadata_filter: Dict) -> bool:
+        """
+        Checks whether a filter only uses indexed fields with plain equality or membership
+
+        Args:
+              metadata_filter: LangChain-style filter dictionary
+        Returns:
+              True if select() can resolve the filter
+        """
+        if not isinstance(metadata_filter, dict) or not metadata_filter:
+            return False
+        for field, value in metadata_filter.items():
+            if field not in self._bitmaps:
+                return False
+            if isinstance(value, dict):
+                return False
+        return True
+
+    def _field_bitmap(self, field: str, value: Any) -> np.ndarray:
+        """
+        Bitmap of positions whose field equals the value, or any of the values of a list
+
+        Args:
+              field: Indexed metadata field
+              value: Scalar or list of accepted values
+        Returns:
+              Packed uint8 bitmap
+        """
+        empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        bitmaps = self._bitmaps[field]
+        if isinstance(value, (list, tuple, set)):
+            result = empty
+            for item in value:
+                result = result | bitmaps.get(item, empty)
+            return result
+        return bitmaps.get(value, empty)
+
+    def select(self, metadata_filter: Dict) -> Optional[np.ndarray]:
+        """
+        Resolves a filter to the matching vector positions: OR within a field's values, AND across fields
+
+        Args:
+              metadata_filter: LangChain-style filter dictionary
+        Returns:
+              Sorted int64 array of positions, or None if the filter uses unindexed fields or operators
+        """
+        if not self.supports(metadata_filter):
+            return None
+        result = None
+        for field, value in metadata_filter.items():
+            bitmap = self._field_bitmap(field, value)
+            result = bitmap if result is None else result & bitmap
+        return np.flatnonzero(np.unpackbits(result, count=self.size)).astype(np.int64)
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """
+        Counts the vectors per value of a field
+
+        Args:
+              field: Indexed metadata field
+        Returns:
+              Dictionary of value to number of vectors
+        """
+        return {
+            value: int(np.unpackbits(bitmap, count=self.size).sum())
+            for value, bitmap in self._bitmaps[field].items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the bitmaps
+
+        Args:
+              No arguments
+        Returns:
+              Number of bytes
+        """
+        return sum(bitmap.nbytes for values in self._bitmaps.values() for bitmap in values.values())
@@ -0,0 +1,229 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter, defaultdict
+from pathlib import Path
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.settings import settings
+
+
+BM25_FILE = "bm25.npz"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words in nearly every chunk: they add little to a score but make up most of the postings
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can do does for from had has have how in into is it its "
+    "not of on or our such than that the their then there these this those to was we were what "
+    "when where which while who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase alphanumeric terms, dropping stopwords; "ViT-B/16" gives vit, b, 16
+
+    Args:
+          text: Chunk text or query
+    Returns:
+          List of terms in order
+    """
+    return [term for term in _TOKEN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index over chunk text scored with Okapi BM25. Posting lists are stored in CSR form (one
+    offsets array into flat row and weight arrays), and each posting carries its precomputed BM25
+    term weight, so a query is a few vectorized slice-adds followed by a partial sort
+    """
+
+    def __init__(self, ids: List[str], terms: List[str], indptr: np.ndarray, rows: np.ndarray, weights: np.ndarray):
+        """
+        Wraps already built posting arrays
+
+        Args:
+              ids: Docstore id of each indexed chunk (row)
+              terms: Vocabulary, sorted; term i owns postings indptr[i]:indptr[i + 1]
+              indptr: int64 offsets into rows and weights, one more than there are terms
+              rows: uint32 chunk row of each posting
+              weights: float32 BM25 weight of each posting
+        Returns:
+              None
+        """
+        self.ids = ids
+        self.terms = terms
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+        self._vocabulary = {term: i for i, term in enumerate(terms)}
+        self._row_of: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str]], k1: float = None, b: float = None) -> "BM25Index":
+        """
+        Tokenizes every chunk and builds the posting lists
+
+        Args:
+              entries: (docstore id, chunk text) pairs
+              k1: Term frequency saturation (default BM25_K1)
+              b: Length normalization (default BM25_B)
+        Returns:
+              BM25Index instance
+        """
+        k1 = settings.BM25_K1 if k1 is None else k1
+        b = settings.BM25_B if b is None else b
+        ids: List[str] = []
+        lengths: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for row, (_id, text) in enumerate(entries):
+            tokens = tokenize(text)
+            ids.append(_id)
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((row, frequency))
+
+        terms = sorted(postings)
+        counts = np.fromiter((len(postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        flat = np.array([posting for term in terms for posting in postings[term]], dtype=np.int64).reshape(-1, 2)
+        rows = flat[:, 0].astype(np.uint32)
+        frequencies = flat[:, 1].astype(np.float32)
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        average = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        idf = np.log1p((len(ids) - counts + 0.5) / (counts + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths / average)
+        weights = np.repeat(idf, counts) * frequencies * (k1 + 1) / (frequencies + norm[rows])
+        return cls(ids, terms, indptr, rows, weights.astype(np.float32))
+
+    def search(self, query: str, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores every chunk containing a query term and keeps the best k
+
+        Args:
+              query: Query text
+              k: Number of results
+              mask: Boolean array over rows; rows set to False are never returned (optional)
+        Returns:
+              Tuple of (rows, BM25 scores), best first; only chunks sharing a term with the query
+        """
+        term_ids = [self._vocabulary[term] for term in set(tokenize(query)) if term in self._vocabulary]
+        if not term_ids or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # A term lists each row at most once, so fancy-index += is safe
+            scores[self.rows[start:end]] += self.weights[start:end]
+        if mask is not None:
+            scores[~mask] = 0
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return hits.astype(np.int64), scores[hits]
+
+    def row_of(self, _id: str) -> Optional[int]:
+        """
+        Looks up the row of a docstore id
+
+        Args:
+              _id: Docstore id
+        Returns:
+              Row, or None if the chunk is not indexed
+        """
+        if self._row_of is None:
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        return self._row_of.get(_id)
+
+    def save(self, path: Path) -> None:
+        """
+        Writes the vocabulary, ids and posting arrays to one .npz file
+
+        Args:
+              path: File to write
+        Returns:
+              None
+        """
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(self.ids, dtype=str),
+                terms=np.array(self.terms, dtype=str),
+                indptr=self.indptr,
+                rows=self.rows,
+                weights=self.weights,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """
+        Reads an index written by save()
+
+        Args:
+              path: File to read
+        Returns:
+              BM25Index instance
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["ids"].tolist(),
+                data["terms"].tolist(),
+                data["indptr"],
+                data["rows"],
+                data["weights"],
+            )
+
+    def __len__(self) -> int:
+        """
+        Number of indexed chunks
+
+        Args:
+              No arguments
+        Returns:
+              Number of rows
+        """
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the posting arrays
+
+        Args:
+              No arguments
+        Returns:
+              Number of bytes
+        """
+        return self.indptr.nbytes + self.rows.nbytes + self.weights.nbytes
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, constant: int = None) -> List[Document]:
+    """
+    Merges ranked lists by reciprocal rank fusion: each document scores the sum of
+    1 / (constant + rank) over the lists it appears in, so agreement between lists wins and raw
+    scores of different retrievers never have to be compared
+
+    Args:
+          rankings: Ranked document lists, best first
+          k: Number of documents to keep
+          constant: Rank offset damping the top ranks (default RRF_K)
+    Returns:
+          Up to k documents, best first
+    """
+    constant = settings.RRF_K if constant is None else constant
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.id or doc.page_content
+            scores[key] += 1.0 / (constant + rank)
+            documents.setdefault(key, doc)
+    # sorted() is stable, so ties keep the order of first appearance
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
@@ -1,10 +1,13 @@
-from typing import List, Optional, Generator
+from typing import Dict, List, Optional, Generator, Tuple
+import time
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
 from config.settings import settings
 from core.vector_store import VectorStoreManager
+from core.bm25_index import reciprocal_rank_fusion
+from core.reranker import CrossEncoderReranker
 
 
 """
@@ -44,7 +47,8 @@ class RAGChain:
         self,
         vector_store_manager: VectorStoreManager,
         model_name: str = None,
-        temperature: float = None
+        temperature: float = None,
+        reranker: Optional[CrossEncoderReranker] = None
     ):
         """
         Initialize the RAG chain with vector store and model configurations
@@ -53,10 +57,14 @@ class RAGChain:
                vector_store_manager: VectorStoreManager instance with indexed documents
                model_name: Groq model name (default from settings)
                temperature: LLM temperature (default from settings)
+               reranker: Second-stage reranker (default: one from settings when RERANK_ENABLED, else none)
         Returns:
                None
         """
         self.vector_store = vector_store_manager
+        if reranker is None and settings.RERANK_ENABLED:
+            reranker = CrossEncoderReranker()
+        self.reranker = reranker
         self.model_name = model_name or settings.GPT_MODEL_NAME
         self.temperature = temperature if temperature is not None else settings.TEMPRATURE
         
@@ -108,27 +116,75 @@ class RAGChain:
         metadata_filter: dict | None = None
     ) -> List[Document]:
         """
-        Searches and retrieves relevant documents from the vector store based on the query
+        Searches and retrieves relevant documents from the vector store based on the query, fusing
+        dense and BM25 keyword hits by reciprocal rank when HYBRID_SEARCH is on, then reranking
+        a wider candidate set when a reranker is configured
 
         Args:
                query: User query string
-               k: Number of documents to retrieve
+               k: Number of documents to retrieve (default TOP_K_RESULTS, or RERANK_TOP_N when reranking)
                metadata_filter: Dictionary for filtering results based on metadata
         Returns:
                List of relevant Document objects
         """
+        documents, _ = self.retrieve_with_timings(query, k, metadata_filter)
+        return documents
+
+    def retrieve_with_timings(
+        self,
+        query: str,
+        k: int = None,
+        metadata_filter: dict | None = None
+    ) -> Tuple[List[Document], Dict]:
+        """
+        Runs both retrieval stages and times each of them
 
+        Args:
+               query: User query string
+               k: Number of documents to keep
+               metadata_filter: Dictionary for filtering results based on metadata
+        Returns:
+               Tuple of (relevant Document objects, per-stage timings in ms plus reranking counts)
+        """
+        timings = {}
         if not self.vector_store.is_initialized():
-            return []
+            return [], timings
+
+        k = k or (settings.RERANK_TOP_N if self.reranker else settings.TOP_K_RESULTS)
+        # The reranker picks from a wider, cheaply retrieved candidate set
+        fetch_k = max(self.reranker.max_candidates, k) if self.reranker else k
+
+        start = time.perf_counter()
+        # Weak and near-duplicate chunks are dropped here rather than padding the prompt to k
+        scored = self.vector_store.search_with_scores(
+            query=query,
+            k=fetch_k,
+            metadata_filter=metadata_filter,
+            score_threshold=settings.RETRIEVAL_MIN_SCORE or None,
+            mmr=settings.RETRIEVAL_MMR
+        )
+        documents = [doc for doc, _ in scored]
 
-        if metadata_filter:
-            retriever = self.vector_store.get_retriever(
-                k=k,
-                metadata_filter=metadata_filter
+        if settings.HYBRID_SEARCH:
+            # Exact terms the embedding misses (model names, acronyms) come in from BM25 without raising k;
+            # they face the same similarity floor, but MMR only diversifies the dense hits
+            keyword = self.vector_store.keyword_search(
+                query,
+                k=fetch_k,
+                metadata_filter=metadata_filter,
+                score_threshold=settings.RETRIEVAL_MIN_SCORE or None
             )
-            return retriever.invoke(query)
+            if keyword:
+                documents = reciprocal_rank_fusion([documents, [doc for doc, _ in keyword]], fetch_k)
+        timings["retrieve_ms"] = (time.perf_counter() - start) * 1000
 
-        return self.vector_store.search(query=query, k=k)
+        if self.reranker is not None and documents:
+            reranked, report = self.reranker.rerank(query, documents, k)
+            documents = [doc for doc, _ in reranked]
+            timings["rerank_ms"] = report["ms"]
+            timings["rerank_scored"] = report["scored"]
+            timings["rerank_candidates"] = report["candidates"]
+        return documents, timings
 
     
     def generate(self, query: str, context: str) -> str:
@@ -177,19 +233,22 @@ class RAGChain:
                metadata_filter: Dictionary for filtering documents
                k: Number of documents to retrieve
         Returns:
-               Dictionary containing the answer, unique sources, context, and raw documents
+               Dictionary containing the answer, unique sources, context, raw documents and per-stage timings
         """
-        documents = self.retrieve(question, k=k,metadata_filter=metadata_filter)
+        documents, timings = self.retrieve_with_timings(question, k=k, metadata_filter=metadata_filter)
         context = self._format_context(documents)
         
+        start = time.perf_counter()
         answer = self.generate(question, context)
+        timings["generate_ms"] = (time.perf_counter() - start) * 1000
         
         sources = [doc.metadata.get("title", "Unknown") for doc in documents]
         return {
             "answer": answer,
             "sources": list(set(sources)), 
             "context": context,
-            "documents": documents
+            "documents": documents,
+            "timings": timings
         }
     
     def query_stream(self, question: str, k: int = None) -> Generator[str, None, None]:
@@ -2,6 +2,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config.settings import Settings
 from typing import List,Dict
 from langchain_core.documents import Document
+from core.embedding import EmbeddingManager
 
 class Chunking:
     """
@@ -12,22 +13,40 @@ class Chunking:
             self,
             document: List[Document],
             chunk_size: int = None,
-            chunk_overlap: int = None            
+            chunk_overlap: int = None,
+            chunk_unit: str = None,
+            embedding_manager: EmbeddingManager = None
     ):
         """
         Initializes the chunking processor with documents and splitting parameters
 
         Args:
               document: List of Document objects to be split
-              chunk_size: Maximum size of each text chunk (optional)
-              chunk_overlap: Number of overlapping characters between chunks (optional)
+              chunk_size: Maximum size of each text chunk, in chunk_unit (optional)
+              chunk_overlap: Overlap between chunks, in chunk_unit (optional)
+              chunk_unit: "chars" or "tokens" of the embedding model's tokenizer (optional)
+              embedding_manager: EmbeddingManager whose tokenizer and sequence limit are used (optional)
         Returns:
               None
         """
-        self.chunk_size = chunk_size or Settings.CHUNK_SIZE
-        self.chunk_overlap = chunk_overlap or Settings.CHUNK_OVERLAP
+        self.chunk_unit = chunk_unit or Settings.CHUNK_UNIT
+        self.embedding_manager = embedding_manager
         self.document = document
 
+        if self.chunk_unit == "tokens":
+            self.embedding_manager = embedding_manager or EmbeddingManager()
+            limit = self.embedding_manager.max_content_tokens
+            self.chunk_size = min(chunk_size or Settings.CHUNK_TOKEN_SIZE or limit, limit)
+            self.chunk_overlap = chunk_overlap or Settings.CHUNK_TOKEN_OVERLAP
+            if self.chunk_overlap >= self.chunk_size:
+                # The model limit can cap chunk_size below the configured overlap, which the splitter rejects
+                self.chunk_overlap = self.chunk_size // 4
+        elif self.chunk_unit == "chars":
+            self.chunk_size = chunk_size or Settings.CHUNK_SIZE
+            self.chunk_overlap = chunk_overlap or Settings.CHUNK_OVERLAP
+        else:
+            raise ValueError(f"Unsupported chunk unit {self.chunk_unit}")
+
     def intiate_chunk(self)-> List[Document]:
         """
         Splits the stored documents into smaller chunks using RecursiveCharacterTextSplitter
@@ -37,10 +56,66 @@ class Chunking:
         Returns:
               List of split Document objects containing the chunked text
         """
+        has_pages = any("page_breaks" in doc.metadata for doc in self.document)
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", "  ", " ",""]
+            separators=["\n\n", "\n", "  ", " ",""],
+            add_start_index=has_pages,
+            **self._length_kwargs()
         )
         chunks = text_splitter.split_documents(self.document)
-        return chunks
\ No newline at end of file
+        if has_pages:
+            for chunk in chunks:
+                self._assign_page(chunk)
+        return chunks
+
+    def _length_kwargs(self) -> Dict:
+        """
+        Selects how the splitter measures text: characters, or word-pieces of the embedding model
+
+        Args:
+              No arguments
+        Returns:
+              Keyword arguments for RecursiveCharacterTextSplitter
+        """
+        if self.chunk_unit == "tokens":
+            return {"length_function": self.embedding_manager.token_length}
+        return {}
+
+    def truncation_report(self, chunks: List[Document]) -> Dict:
+        """
+        Counts chunks longer than the embedding model's sequence limit, whose tails are never embedded.
+        Every chunk is tokenized again, so this is only worth running on character-sized chunks;
+        token-sized chunks are cut to fit the limit
+
+        Args:
+              chunks: Chunk Documents to check
+        Returns:
+              Dictionary with chunk, truncated chunk and dropped token counts
+        """
+        manager = self.embedding_manager or EmbeddingManager()
+        limit = manager.max_seq_length
+        lengths = [manager.token_length(chunk.page_content, special_tokens=True) for chunk in chunks]
+        return {
+            "chunks": len(chunks),
+            "truncated": sum(1 for length in lengths if length > limit),
+            "tokens_dropped": sum(length - limit for length in lengths if length > limit),
+            "max_seq_length": limit,
+        }
+
+    @staticmethod
+    def _assign_page(chunk: Document) -> None:
+        """
+        Resolves the page a layout-preserving chunk starts on and drops the offset bookkeeping
+
+        Args:
+              chunk: Chunk Document carrying start_index and its section's page_breaks
+        Returns:
+              None
+        """
+        page_breaks = chunk.metadata.pop("page_breaks", None) or []
+        start = chunk.metadata.pop("start_index", 0)
+        for offset, page in page_breaks:
+            if offset <= start:
+                chunk.metadata["page"] = page
\ No newline at end of file
@@ -0,0 +1,155 @@
+from typing import List, Dict
+import hashlib
+import zlib
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.settings import settings
+
+
+_WORD = re.compile(r"\w+")
+
+# Smallest prime above 2**32, so (a * x + b) of 32-bit values never overflows uint64
+_PRIME = np.uint64(4294967311)
+
+
+class ChunkDeduplicator:
+    """
+    Drops chunks that are exact or near duplicates (MinHash over word shingles, LSH banding)
+    of an earlier chunk of the same paper. Papers are deduplicated independently: a passage shared
+    by two papers stays in both, so filtering by either paper finds it and deleting one paper does
+    not take it away from the other
+    """
+
+    def __init__(
+            self,
+            threshold: float = None,
+            num_perm: int = 128,
+            bands: int = 16,
+            shingle_size: int = 5,
+            seed: int = 1
+    ):
+        """
+        Initializes the hash permutations and the LSH band tables
+
+        Args:
+              threshold: Estimated Jaccard similarity at or above which a chunk is dropped (optional)
+              num_perm: Number of MinHash permutations
+              bands: Number of LSH bands; num_perm must be divisible by it
+              shingle_size: Number of words per shingle
+              seed: Seed of the permutation parameters
+        Returns:
+              None
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold or settings.DEDUP_THRESHOLD
+        self.shingle_size = shingle_size
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+
+        self._bands: List[Dict[bytes, List[int]]] = []
+        self._signatures: List[np.ndarray] = []
+        self._exact = set()
+        self.reset(bands)
+
+        self.stats = {"chunks": 0, "dropped": 0, "chars": 0, "chars_dropped": 0}
+
+    def reset(self, bands: int = None) -> None:
+        """
+        Forgets every chunk seen so far; the running stats are kept
+
+        Args:
+              bands: Number of LSH bands (default: unchanged)
+        Returns:
+              None
+        """
+        self._bands = [dict() for _ in range(bands or len(self._bands))]
+        self._signatures = []
+        self._exact = set()
+
+    def _shingles(self, text: str) -> np.ndarray:
+        """
+        Hashes the word shingles of a text
+
+        Args:
+              text: Chunk text
+        Returns:
+              Array of unique 32-bit shingle hashes
+        """
+        words = _WORD.findall(text.lower())
+        k = self.shingle_size
+        grams = [" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))]
+        return np.fromiter({zlib.crc32(gram.encode()) for gram in grams}, dtype=np.uint64)
+
+    def _signature(self, shingles: np.ndarray) -> np.ndarray:
+        """
+        Computes the MinHash signature of a shingle set in one vectorized step
+
+        Args:
+              shingles: Array of shingle hashes
+        Returns:
+              Array of num_perm minimum hash values
+        """
+        return ((np.outer(self._a, shingles) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def is_duplicate(self, text: str) -> bool:
+        """
+        Checks a text against everything seen so far and remembers it if it is new
+
+        Args:
+              text: Chunk text
+        Returns:
+              True if the text duplicates a previously seen chunk
+        """
+        digest = hashlib.blake2b(" ".join(_WORD.findall(text.lower())).encode(), digest_size=16).digest()
+        if digest in self._exact:
+            return True
+
+        signature = self._signature(self._shingles(text))
+        keys = [
+            signature[i * self.rows:(i + 1) * self.rows].tobytes()
+            for i in range(len(self._bands))
+        ]
+
+        candidates = set()
+        for band, key in zip(self._bands, keys):
+            candidates.update(band.get(key, ()))
+        for idx in candidates:
+            if np.mean(self._signatures[idx] == signature) >= self.threshold:
+                return True
+
+        self._exact.add(digest)
+        idx = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in zip(self._bands, keys):
+            band.setdefault(key, []).append(idx)
+        return False
+
+    def filter(self, chunks: List[Document]) -> List[Document]:
+        """
+        Returns the chunks of one paper that are not duplicates of each other, keeping the first occurrence
+
+        Args:
+              chunks: Chunk Documents of a single paper, in order
+        Returns:
+              List of unique chunk Documents
+        """
+        self.reset()
+        kept = []
+        for chunk in chunks:
+            size = len(chunk.page_content)
+            self.stats["chunks"] += 1
+            self.stats["chars"] += size
+            if self.is_duplicate(chunk.page_content):
+                self.stats["dropped"] += 1
+                self.stats["chars_dropped"] += size
+            else:
+                kept.append(chunk)
+        return kept
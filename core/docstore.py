@@ -0,0 +1,414 @@
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+from pathlib import Path
+import threading
+import sqlite3
+import json
+import os
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+DOCSTORE_FILE = "docstore.sqlite"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS positions (position INTEGER PRIMARY KEY, id TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS tombstones (id TEXT PRIMARY KEY)",
+)
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Chunk text and metadata in a SQLite file, read one document at a time by id instead of
+    unpickling the whole corpus; also holds the vector position -> id map of the FAISS index
+    """
+
+    def __init__(self, path: Union[str, Path], read_only: bool = False):
+        """
+        Opens the docstore file, creating the tables if needed; nothing is read up front
+
+        Args:
+              path: Location of the SQLite file
+              read_only: Open a published file that is never modified again: no locks are taken, so
+                    a writer elsewhere never blocks the searches reading it
+        Returns:
+              None
+        """
+        self.path = Path(path)
+        self.read_only = read_only
+        self.temporary = False
+        self._lock = threading.Lock()
+        if read_only:
+            self._conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False
+            )
+            return
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Looks up a document by id
+
+        Args:
+              search: Docstore id
+        Returns:
+              Document, or a "not found" message like LangChain's InMemoryDocstore
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, metadata FROM documents WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Adds documents; changes stay uncommitted until commit() so the file on disk keeps matching
+        the last saved FAISS index
+
+        Args:
+              texts: Dictionary of docstore ids to Documents
+        Returns:
+              None
+        """
+        if not texts:
+            return
+        ids = list(texts)
+        with self._lock:
+            overlapping = self._existing(ids)
+            if overlapping:
+                raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+            self._conn.executemany(
+                "INSERT INTO documents (id, content, metadata) VALUES (?, ?, ?)",
+                [(_id, doc.page_content, json.dumps(doc.metadata, default=str)) for _id, doc in texts.items()]
+            )
+
+    def delete(self, ids: List) -> None:
+        """
+        Deletes documents by id (uncommitted until commit())
+
+        Args:
+              ids: Docstore ids
+        Returns:
+              None
+        """
+        with self._lock:
+            missing = set(ids) - set(self._existing(ids))
+            if missing:
+                raise ValueError(f"Tried to delete ids that does not exist: {sorted(missing)}")
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(_id,) for _id in ids])
+
+    def _existing(self, ids: List[str]) -> List[str]:
+        """
+        Filters ids down to the ones present; caller holds the lock
+
+        Args:
+              ids: Docstore ids
+        Returns:
+              List of ids that have a document
+        """
+        found = []
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            found.extend(row[0] for row in self._conn.execute(
+                f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(batch))})", batch
+            ))
+        return found
+
+    def __len__(self) -> int:
+        """
+        Counts stored documents
+
+        Args:
+              No arguments
+        Returns:
+              Number of documents
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def id_map(self) -> "SQLiteIdMap":
+        """
+        Returns the lazily read vector position -> docstore id mapping stored in this file
+
+        Args:
+              No arguments
+        Returns:
+              SQLiteIdMap bound to this docstore
+        """
+        return SQLiteIdMap(self)
+
+    def metadata_by_position(self) -> List[Tuple[int, Dict]]:
+        """
+        Reads the metadata of every vector in one query, following the stored position -> id map
+
+        Args:
+              No arguments
+        Returns:
+              List of (position, metadata) pairs
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.position, d.metadata FROM positions p JOIN documents d ON d.id = p.id"
+            ).fetchall()
+        return [(position, json.loads(metadata)) for position, metadata in rows]
+
+    def contents_by_position(self) -> List[Tuple[int, str, str]]:
+        """
+        Reads the id and text of every vector in one query, following the stored position -> id map
+
+        Args:
+              No arguments
+        Returns:
+              List of (position, docstore id, chunk text) triples
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT p.position, p.id, d.content FROM positions p JOIN documents d ON d.id = p.id"
+            ).fetchall()
+
+    def write_positions(self, index_to_docstore_id: Mapping[int, str]) -> None:
+        """
+        Replaces the stored position -> id map (uncommitted until commit())
+
+        Args:
+              index_to_docstore_id: FAISS position to docstore id mapping
+        Returns:
+              None
+        """
+        if isinstance(index_to_docstore_id, SQLiteIdMap) and index_to_docstore_id.docstore is self:
+            # Every change was already written through
+            return
+        rows = list(index_to_docstore_id.items())
+        with self._lock:
+            self._conn.execute("DELETE FROM positions")
+            self._conn.executemany("INSERT INTO positions (position, id) VALUES (?, ?)", rows)
+
+    def tombstones(self) -> List[str]:
+        """
+        Reads the ids of documents marked deleted but still present in the saved index
+
+        Args:
+              No arguments
+        Returns:
+              List of docstore ids
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM tombstones")]
+
+    def write_tombstones(self, ids: Iterable[str]) -> None:
+        """
+        Replaces the stored tombstones (uncommitted until commit())
+
+        Args:
+              ids: Docstore ids marked deleted
+        Returns:
+              None
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM tombstones")
+            self._conn.executemany("INSERT INTO tombstones (id) VALUES (?)", [(_id,) for _id in ids])
+
+    def commit(self) -> None:
+        """
+        Makes pending additions and deletions durable
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        """
+        Closes the database, discarding uncommitted changes; the file of a working copy is deleted
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        with self._lock:
+            self._conn.close()
+        if self.temporary:
+            self.path.unlink(missing_ok=True)
+
+    def working_copy(self, path: Union[str, Path]) -> "SQLiteDocstore":
+        """
+        Copies the database to a private file a writer can change without touching this one
+
+        Args:
+              path: Location of the copy, deleted again when the copy is closed
+        Returns:
+              SQLiteDocstore opened on the copy
+        """
+        target = sqlite3.connect(str(path))
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+        copy = type(self)(path)
+        copy.temporary = True
+        return copy
+
+    def _copy_documents(self, target: "SQLiteDocstore", ids: set) -> None:
+        """
+        Copies the rows of the given ids to another docstore in bulk, including uncommitted changes
+
+        Args:
+              target: Docstore to insert into
+              ids: Docstore ids to copy
+        Returns:
+              None
+        """
+        found = 0
+        with self._lock:
+            cursor = self._conn.execute("SELECT id, content, metadata FROM documents")
+            while True:
+                batch = cursor.fetchmany(1000)
+                if not batch:
+                    break
+                rows = [row for row in batch if row[0] in ids]
+                target._conn.executemany("INSERT INTO documents (id, content, metadata) VALUES (?, ?, ?)", rows)
+                found += len(rows)
+        if found != len(ids):
+            raise ValueError(f"Could not find {len(ids) - found} documents referenced by the position map")
+
+    @classmethod
+    def write(
+            cls,
+            path: Union[str, Path],
+            docstore: Docstore,
+            index_to_docstore_id: Mapping[int, str]
+    ) -> "SQLiteDocstore":
+        """
+        Writes every document referenced by an id map to a new docstore file, replacing any
+        existing file only once the new one is complete
+
+        Args:
+              path: Destination of the SQLite file
+              docstore: Docstore holding the documents (in-memory or SQLite)
+              index_to_docstore_id: FAISS position to docstore id mapping
+        Returns:
+              SQLiteDocstore opened on the written file
+        """
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        target = cls(tmp_path)
+        if isinstance(docstore, SQLiteDocstore):
+            docstore._copy_documents(target, set(index_to_docstore_id.values()))
+        else:
+            rows = []
+            for position, _id in sorted(index_to_docstore_id.items()):
+                doc = docstore.search(_id)
+                if not isinstance(doc, Document):
+                    raise ValueError(f"Could not find document for id {_id}, got {doc}")
+                rows.append((_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+                if len(rows) >= 1000:
+                    target._conn.executemany("INSERT INTO documents (id, content, metadata) VALUES (?, ?, ?)", rows)
+                    rows = []
+            target._conn.executemany("INSERT INTO documents (id, content, metadata) VALUES (?, ?, ?)", rows)
+        target.write_positions(index_to_docstore_id)
+        target.commit()
+        target.close()
+
+        os.replace(tmp_path, path)
+        return cls(path)
+
+
+class SQLiteIdMap(MutableMapping):
+    """
+    FAISS position -> docstore id mapping read from and written through to a SQLiteDocstore
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        """
+        Binds the mapping to its docstore
+
+        Args:
+              docstore: SQLiteDocstore holding the positions table
+        Returns:
+              None
+        """
+        self.docstore = docstore
+
+    def __getitem__(self, position: int) -> str:
+        """
+        Reads the docstore id stored at a FAISS position
+        """
+        with self.docstore._lock:
+            row = self.docstore._conn.execute(
+                "SELECT id FROM positions WHERE position = ?", (int(position),)
+            ).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __setitem__(self, position: int, _id: str) -> None:
+        """
+        Stores the docstore id of a FAISS position
+        """
+        with self.docstore._lock:
+            self.docstore._conn.execute(
+                "INSERT OR REPLACE INTO positions (position, id) VALUES (?, ?)", (int(position), _id)
+            )
+
+    def __delitem__(self, position: int) -> None:
+        """
+        Forgets a FAISS position
+        """
+        with self.docstore._lock:
+            cursor = self.docstore._conn.execute("DELETE FROM positions WHERE position = ?", (int(position),))
+        if cursor.rowcount == 0:
+            raise KeyError(position)
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Iterates over the stored positions in order
+        """
+        with self.docstore._lock:
+            positions = [row[0] for row in self.docstore._conn.execute("SELECT position FROM positions ORDER BY position")]
+        return iter(positions)
+
+    def __len__(self) -> int:
+        """
+        Counts the stored positions
+        """
+        with self.docstore._lock:
+            return self.docstore._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def items(self):
+        """
+        Reads every (position, id) pair in one query instead of one lookup per position
+        """
+        with self.docstore._lock:
+            return self.docstore._conn.execute("SELECT position, id FROM positions ORDER BY position").fetchall()
+
+    def values(self):
+        """
+        Reads every stored id in position order
+        """
+        return [_id for _, _id in self.items()]
+
+    def update(self, other=(), **kwargs) -> None:
+        """
+        Stores many positions in one statement; LangChain calls this for every add
+        """
+        rows = list(dict(other, **kwargs).items())
+        with self.docstore._lock:
+            self.docstore._conn.executemany(
+                "INSERT OR REPLACE INTO positions (position, id) VALUES (?, ?)", [(int(p), _id) for p, _id in rows]
+            )
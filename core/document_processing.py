@@ -1,38 +1,71 @@
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
 from langchain_core.documents import Document
 from core.structure import ResearchPaper
-from typing import List, Optional,Dict
+from core.section_detection import SectionDetector, TITLE_SECTION
+from config.settings import settings
+from typing import List, Optional,Dict,Iterator
+from dataclasses import dataclass
+from itertools import accumulate
+from bisect import bisect_right
 from pathlib import Path
 import re
 
 
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+_INLINE_SPACE = re.compile(r"[ \t\u00a0]+")
 
 
+@dataclass
+class ParsedDocument:
+    """
+    Result of parsing a file once: loaded pages, raw file metadata, normalized text and its tokens
+
+    In layout-preserving mode layout_text keeps line and paragraph breaks and the original case,
+    text is the same string lowercased with separators flattened (so character offsets are shared),
+    and page_starts holds the offset at which each page begins
+    """
+    pages: List[Document]
+    metadata: Dict
+    text: str
+    tokens: List[str]
+    layout_text: Optional[str] = None
+    page_starts: Optional[List[int]] = None
+
 
 class DocumentProcessor:
     """
     Handles the loading, processing, and section-based segmentation of documents
     """
-    def __init__(self,path:str=None
+    # Bump whenever the produced sections change so the ingestion manifest re-processes every paper
+    PARSER_VERSION = 2
+
+    _detector = SectionDetector()
+
+    def __init__(self,path:str=None,
+                 preserve_layout:bool=None
                  ):
         """
         Initializes the document processor with the file path
 
         Args:
               path: File path string to the document
+              preserve_layout: Keep line/paragraph structure in section text (default from settings)
         Returns:
               None
         """
         self.path=path
+        self.preserve_layout=settings.PRESERVE_LAYOUT if preserve_layout is None else preserve_layout
+        self._parsed:Optional[ParsedDocument]=None
+        self._streamed_metadata:Optional[Dict]=None
 
-    def load_document(self)->List[Document]:
+    def _loader(self):
         """
-        Loads the document content using the appropriate loader based on file extension
+        Selects the LangChain loader matching the file extension
 
         Args:
               No arguments
         Returns:
-              List of Document objects loaded from the file
+              Loader instance for the file
         """
 
         if not Path(self.path).exists():
@@ -47,7 +80,31 @@ class DocumentProcessor:
             loader = TextLoader(self.path,encoding="utf-8")
         else:
             raise ValueError(f"Unsupported file format {self.path}") 
-        return loader.load()
+        return loader
+
+    def load_document(self)->List[Document]:
+        """
+        Loads the document content using the appropriate loader based on file extension
+
+        Args:
+              No arguments
+        Returns:
+              List of Document objects loaded from the file
+        """
+        return self._loader().load()
+
+    @staticmethod
+    def _normalize(text:str)->str:
+        """
+        Lowercases text and flattens newlines and colons into spaces
+
+        Args:
+              text: Raw page text
+        Returns:
+              Normalized text
+        """
+        return text.lower().replace("\n"," ").replace(":"," ")
+
     def _document_to_text(self,document:List[Document])->List[str]:
         """
         Converts a list of Documents into a clean, tokenized list of strings
@@ -57,53 +114,130 @@ class DocumentProcessor:
         Returns:
               List of string tokens from the document content
         """
-        text = str()
-        for doc in document:
-            text+=doc.page_content
-            text+=" "
-        text = text.lower().replace("\n"," ").replace(":"," ")
-        return text.split(" ")
+        return self._document_to_normalized_text(document).split(" ")
+
+    def _document_to_normalized_text(self,document:List[Document])->str:
+        """
+        Joins the Documents' content into one normalized string; splitting it on " " gives the tokens
+
+        Args:
+              document: List of Document objects
+        Returns:
+              Normalized document text
+        """
+        return self._normalize("".join(doc.page_content + " " for doc in document))
+
+    @staticmethod
+    def _layout_page(text:str)->str:
+        """
+        Cleans one page while keeping its structure: rejoins hyphenated line breaks, collapses
+        inline whitespace, and marks paragraph ends (blank lines, or short lines closing a sentence)
+        with an empty line
+
+        Args:
+              text: Raw page text
+        Returns:
+              Page text with "\n" between lines and "\n\n" between paragraphs
+        """
+        text = _HYPHEN_BREAK.sub(r"\1\2", text)
+        lines = [_INLINE_SPACE.sub(" ", line).strip() for line in text.split("\n")]
+        widths = sorted(len(line) for line in lines if line)
+        typical = widths[len(widths) // 2] if widths else 0
+
+        kept = []
+        for line in lines:
+            if not line:
+                if kept and kept[-1]:
+                    kept.append("")
+                continue
+            kept.append(line)
+            if line[-1] in ".!?:" and len(line) < 0.8 * typical:
+                kept.append("")
+        return "\n".join(kept).strip()
+
+    def _layout_normalize(self,text:str)->str:
+        """
+        Same normalization as _normalize, but guaranteed to keep the string length so offsets carry over
+
+        Args:
+              text: Layout-preserving text
+        Returns:
+              Normalized text of identical length
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        return lowered.replace("\n"," ").replace(":"," ")
+
+    def _parse_layout(self,pages:List[Document])->ParsedDocument:
+        """
+        Builds a ParsedDocument whose sections can be cut from layout-preserving text
+
+        Args:
+              pages: Loaded page Documents
+        Returns:
+              ParsedDocument with layout_text and page_starts set
+        """
+        page_texts = [self._layout_page(page.page_content) for page in pages]
+        page_starts = list(accumulate((len(t) + 2 for t in page_texts[:-1]), initial=0)) if page_texts else []
+        layout_text = "\n\n".join(page_texts)
+        text = self._layout_normalize(layout_text)
+        return ParsedDocument(
+            pages=pages,
+            metadata=pages[0].metadata if pages else {},
+            text=text,
+            tokens=text.split(" "),
+            layout_text=layout_text,
+            page_starts=page_starts
+        )
+
+    def parse(self)->ParsedDocument:
+        """
+        Loads and tokenizes the document on first call and returns the cached result afterwards
+
+        Args:
+              No arguments
+        Returns:
+              ParsedDocument holding pages, raw metadata, normalized text and tokens
+        """
+        if self._parsed is None and self.preserve_layout:
+            self._parsed = self._parse_layout(self.load_document())
+        elif self._parsed is None:
+            pages = self.load_document()
+            text = self._document_to_normalized_text(pages)
+            self._parsed = ParsedDocument(
+                pages=pages,
+                metadata=pages[0].metadata if pages else {},
+                text=text,
+                tokens=text.split(" ")
+            )
+        return self._parsed
+
     @property
     def pdf_metadata(self)->Dict:
         """
-        Extracts metadata from the loaded document
+        Extracts metadata from the parsed (or already streamed) document without loading the file again
 
         Args:
               No arguments
         Returns:
               Dictionary containing document metadata
         """
-        doc  = self.load_document()
-        _meta = doc[0].metadata
-        return _meta
+        if self._parsed is None and self._streamed_metadata is not None:
+            return self._streamed_metadata
+        return self.parse().metadata
 
-    def _section_info(self,text_list:List[str])->Dict:
+    def _section_info(self,text_list:List[str],text:str=None)->Dict:
         """
-        Identifies logical sections in the text based on predefined patterns
+        Identifies logical sections in the text in a single pass over the tokens
 
         Args:
               text_list: List of string tokens representing the document text
+              text: Normalized text the tokens were split from (optional)
         Returns:
               Dictionary mapping section names to their starting indices
         """
-        SECTION_PATTERNS = {
-            "abstract": ["abstract","abstract:","abstract."],
-            "introduction": ["introduction",r"introduction[a-z\:\-]?"],
-            "related_work": ["related work", "background"],
-            "methodology": ["methodology", "methods", "approach"],
-            "conclusion": ["conclusions", "future work","conclusion"],
-            "references": ["references", "bibliography"]
-        }
-        curr_pos = 0
-        page_dict = dict()
-        page_dict["Paper title and author info"] = 0
-        for key,value in SECTION_PATTERNS.items():
-            for pattern in value:
-                if pattern in text_list[curr_pos:]:
-                    if pattern not in page_dict.keys():
-                        page_dict[pattern]=curr_pos+text_list[curr_pos:].index(pattern)
-                        curr_pos = page_dict[pattern]
-                        break
+        page_dict = self._detector.detect(text_list,text)
         print(page_dict)
         return page_dict
     
@@ -144,9 +278,44 @@ class DocumentProcessor:
             )
         )
         return upadted_document
+
+    def _layout_document_prep(self,page_dict:Dict,parsed:ParsedDocument)->List[Document]:
+        """
+        Cuts layout-preserving section Documents and records where each page starts inside them
+
+        Args:
+              page_dict: Dictionary of section token indices
+              parsed: ParsedDocument produced in layout-preserving mode
+        Returns:
+              List of Document objects with section, page and page_breaks metadata
+        """
+        token_starts = list(accumulate((len(token) + 1 for token in parsed.tokens), initial=0))
+        bounds = [token_starts[index] for index in page_dict.values()] + [len(parsed.layout_text)]
+        page_numbers = [page.metadata.get("page", i) for i, page in enumerate(parsed.pages)]
+
+        section_docs = []
+        for section, start, end in zip(page_dict.keys(), bounds, bounds[1:]):
+            first_page = max(0, bisect_right(parsed.page_starts, start) - 1)
+            page_breaks = [
+                [page_start - start, page_numbers[i]]
+                for i, page_start in enumerate(parsed.page_starts)
+                if start < page_start < end
+            ]
+            section_docs.append(
+                Document(
+                    page_content = parsed.layout_text[start:end],
+                    metadata = {
+                        "section": section,
+                        "page": page_numbers[first_page] if page_numbers else 0,
+                        "page_breaks": page_breaks
+                    }
+                )
+            )
+        return section_docs
+
     def process(self)->List[Document]:
         """
-        Executes the full pipeline: load, convert, identify sections, and segment document
+        Executes the full pipeline: parse (once), identify sections, and segment document
 
         Args:
               No arguments
@@ -154,8 +323,46 @@ class DocumentProcessor:
               List of processed Document objects split by section
         """
 
-        loaded_document = self.load_document()
-        text = self._document_to_text(loaded_document)
-        section_dict = self._section_info(text)
-        upadted_document = self._document_prep(section_dict,text)
-        return upadted_document
\ No newline at end of file
+        parsed = self.parse()
+        section_dict = self._section_info(parsed.tokens,parsed.text)
+        if parsed.layout_text is not None:
+            return self._layout_document_prep(section_dict,parsed)
+        upadted_document = self._document_prep(section_dict,parsed.tokens)
+        return upadted_document
+
+    def stream_sections(self)->Iterator[Document]:
+        """
+        Streams section Documents page by page, yielding each section as soon as the next heading closes it
+
+        Always uses the flat (space-joined) normalization; layout preservation needs the whole
+        document. Only the tokens of the currently open section are held in memory. Headings are matched greedily:
+        the first heading of any later section closes the current one, which can differ
+        from process() when a later heading word appears in running text before the expected heading
+
+        Args:
+              No arguments
+        Returns:
+              Iterator of Document objects split by section
+        """
+        matcher = self._detector.matcher()
+        section = TITLE_SECTION
+        section_rank = -1
+        buffer: List[str] = []
+        buffer_start = 0
+
+        for page in self._loader().lazy_load():
+            if self._streamed_metadata is None:
+                self._streamed_metadata = page.metadata
+            for token in self._normalize(page.page_content).split(" "):
+                buffer.append(token)
+                heading = matcher.feed(token, after_rank=section_rank)
+                if heading is None:
+                    continue
+
+                pattern, rank, start = heading
+                split = max(0, start - buffer_start)
+                yield Document(page_content=' '.join(buffer[:split]), metadata={"section": section})
+                section, section_rank = pattern, rank
+                buffer, buffer_start = buffer[split:], buffer_start + split
+
+        yield Document(page_content=' '.join(buffer), metadata={"section": section})
\ No newline at end of file
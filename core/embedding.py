@@ -1,6 +1,61 @@
 from config.settings import settings
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+from core.embedding_cache import CachedEmbeddings, open_cache
+from core.model_registry import LoadedModel, get_model
+from core.onnx_backend import backend_tag
+from core.query_cache import QueryCache
 from typing import List, Dict
+import threading
+import time
+
+import numpy as np
+
+
+class _BatchedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings adapter routing document embedding through EmbeddingManager.embed_batch
+    """
+
+    def __init__(self, manager: "EmbeddingManager"):
+        """
+        Binds the adapter to its manager
+
+        Args:
+              manager: EmbeddingManager doing the work
+        Returns:
+              None
+        """
+        self.manager = manager
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts with the batch engine
+
+        Args:
+              texts: List of input strings
+        Returns:
+              List of embeddings, one per text
+        """
+        return self.manager.embed_batch(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a single query, answering repeated queries from the model's shared LRU query cache
+
+        Args:
+              text: Query string
+        Returns:
+              Query embedding
+        """
+        cache = self.manager.query_cache
+        # Embed the normalized text itself so a cached vector is exactly what a miss would compute
+        text = cache.normalize(text)
+        vector = cache.get(text)
+        if vector is None:
+            vector = self.manager._embedding.embed_query(text)
+            cache.put(text, vector)
+        return list(map(float, vector))
 
 
 class EmbeddingManager:
@@ -8,33 +63,249 @@ class EmbeddingManager:
     Manages text embeddings using a specified HuggingFace model
     """
 
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, backend: str = None, quantize: str = None):
         """
-        Initializes the EmbeddingManager with a specific model or default from settings
+        Initializes the EmbeddingManager with a specific model or default from settings; the model
+        itself is loaded from the shared registry on first use
 
         Args:
               model_name: Name of the HuggingFace model to use (optional)
+              backend: "torch" or "onnx" (optional)
+              quantize: int8 quantization config for the ONNX backend, empty for none (optional)
         Returns:
               None
         """
         self.model_name = model_name or settings.EMBEDDING_MODEL
-        self._embedding = HuggingFaceEmbeddings(
-            model_name=self.model_name,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        if self.backend not in ("torch", "onnx"):
+            raise ValueError(f"Unsupported embedding backend: {self.backend}")
+        self.quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+        self.backend_tag = backend_tag(self.backend, self.quantize)
+
+        self.batch_size = settings.EMBED_BATCH_SIZE
+        self.num_threads = settings.EMBED_NUM_THREADS
+        self.num_workers = settings.EMBED_NUM_WORKERS
+        self.stats = {"texts": 0, "tokens": 0, "seconds": 0.0}
+        self._pool = None
+        self._pool_workers = 0
+        self._pool_lock = threading.Lock()
+        self._batched_embedding = _BatchedEmbeddings(self)
+
+        self.cache = open_cache()
+        self._cached_embedding = None
+        if self.cache is not None:
+            self._cached_embedding = CachedEmbeddings(
+                self._batched_embedding,
+                self.cache,
+                # Backends produce slightly different vectors, so they get separate cache entries
+                model_name=self.model_name if self.backend_tag == "torch" else f"{self.model_name}@{self.backend_tag}",
+                normalize=True
+            )
 
     @property
-    def embedding(self) -> HuggingFaceEmbeddings:
+    def _model(self) -> LoadedModel:
         """
-        Retrieves the initialized HuggingFaceEmbeddings instance
+        Retrieves the shared model, loading it if no manager has used it yet
+
+        Args:
+              No arguments
+        Returns:
+              LoadedModel from the process-wide registry
+        """
+        return get_model(self.model_name, self.backend, self.quantize)
+
+    @property
+    def _embedding(self) -> HuggingFaceEmbeddings:
+        """
+        Retrieves the LangChain wrapper of the shared sentence-transformers model
 
         Args:
               No arguments
         Returns:
               HuggingFaceEmbeddings instance
         """
-        return self._embedding
+        return self._model.embedding
+
+    @property
+    def _tokenizer_lock(self) -> threading.Lock:
+        """
+        Retrieves the lock guarding the shared model's tokenizer
+
+        Args:
+              No arguments
+        Returns:
+              Lock shared by every manager of the model
+        """
+        return self._model.tokenizer_lock
+
+    @property
+    def query_cache(self) -> QueryCache:
+        """
+        Retrieves the query-embedding cache shared by every search path using this model
+
+        Args:
+              No arguments
+        Returns:
+              QueryCache instance
+        """
+        return self._model.query_cache
+
+    @property
+    def embedding(self) -> Embeddings:
+        """
+        Retrieves the embeddings used for indexing and search, backed by the disk cache when enabled
+
+        Args:
+              No arguments
+        Returns:
+              LangChain Embeddings instance
+        """
+        return self._cached_embedding or self._batched_embedding
+
+    @property
+    def tokenizer(self):
+        """
+        Retrieves the tokenizer of the underlying sentence-transformers model
+
+        Args:
+              No arguments
+        Returns:
+              HuggingFace tokenizer instance
+        """
+        return self._embedding._client.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        """
+        Retrieves the number of word-pieces (special tokens included) the model reads before truncating
+
+        Args:
+              No arguments
+        Returns:
+              Integer maximum sequence length
+        """
+        return self._embedding._client.max_seq_length
+
+    @property
+    def max_content_tokens(self) -> int:
+        """
+        Retrieves the number of content word-pieces that fit next to the model's special tokens
+
+        Args:
+              No arguments
+        Returns:
+              Integer token budget for a chunk
+        """
+        return self.max_seq_length - self.tokenizer.num_special_tokens_to_add()
+
+    def token_length(self, text: str, special_tokens: bool = False) -> int:
+        """
+        Counts the word-pieces the model's tokenizer produces for a text, without truncation
+
+        Args:
+              text: The input string
+              special_tokens: Whether to include the model's special tokens in the count
+        Returns:
+              Integer number of tokens
+        """
+        with self._tokenizer_lock:
+            tokens = self.tokenizer.encode(text, add_special_tokens=special_tokens, truncation=False)
+        return len(tokens)
+
+    def embed_batch(
+            self,
+            texts: List[str],
+            batch_size: int = None,
+            num_threads: int = None,
+            num_workers: int = None
+    ) -> np.ndarray:
+        """
+        Embeds many texts at once: texts are sorted by length so each batch pads to similar lengths,
+        torch uses the requested number of CPU threads, and large inputs can be spread over a
+        multi-process worker pool that is kept for later calls. Throughput is added to self.stats
+
+        Args:
+              texts: List of input strings
+              batch_size: Texts per forward pass (optional)
+              num_threads: torch CPU threads, 0 keeps the torch default; ignored by ONNX (optional)
+              num_workers: Worker processes, 0 or 1 embeds in this process (optional)
+        Returns:
+              Float32 array of shape (len(texts), dimension), L2-normalized, in input order
+        """
+        batch_size = batch_size or self.batch_size
+        num_threads = self.num_threads if num_threads is None else num_threads
+        num_workers = self.num_workers if num_workers is None else num_workers
+        if not texts:
+            return np.zeros((0, self.get_embedding_dimension()), dtype=np.float32)
+
+        if num_threads and self.backend == "torch":
+            import torch
+            torch.set_num_threads(num_threads)
+
+        start = time.perf_counter()
+        cleaned = [text.replace("\n", " ") for text in texts]
+        # One tokenizer pass gives both the sort key and the token count for the stats
+        with self._tokenizer_lock:
+            lengths = [
+                len(ids) for ids in
+                self.tokenizer(cleaned, truncation=True, max_length=self.max_seq_length)["input_ids"]
+            ]
+        order = sorted(range(len(cleaned)), key=lambda i: lengths[i], reverse=True)
+        ordered = [cleaned[i] for i in order]
+
+        client = self._embedding._client
+        if num_workers > 1 and len(ordered) >= batch_size * num_workers:
+            vectors = client.encode_multi_process(ordered, self._worker_pool(num_workers), batch_size=batch_size)
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        else:
+            vectors = client.encode(
+                ordered,
+                batch_size=batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+
+        result = np.empty_like(vectors, dtype=np.float32)
+        result[order] = vectors
+        self.stats["texts"] += len(texts)
+        self.stats["tokens"] += sum(lengths)
+        self.stats["seconds"] += time.perf_counter() - start
+        return result
+
+    def _worker_pool(self, num_workers: int) -> Dict:
+        """
+        Retrieves the multi-process worker pool, starting it on first use; the workers load the model
+        once and serve every later call until close_worker_pool()
+
+        Args:
+              num_workers: Number of worker processes; a pool of another size is replaced
+        Returns:
+              sentence-transformers multi-process pool
+        """
+        with self._pool_lock:
+            if self._pool is not None and self._pool_workers != num_workers:
+                self._embedding._client.stop_multi_process_pool(self._pool)
+                self._pool = None
+            if self._pool is None:
+                self._pool = self._embedding._client.start_multi_process_pool(["cpu"] * num_workers)
+                self._pool_workers = num_workers
+            return self._pool
+
+    def close_worker_pool(self) -> None:
+        """
+        Stops the multi-process worker pool if one was started
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._embedding._client.stop_multi_process_pool(self._pool)
+                self._pool = None
+                self._pool_workers = 0
 
     def embed_text(self, text: str) -> List[float]:
         """
@@ -47,6 +318,25 @@ class EmbeddingManager:
         """
         return self.embedding.embed_query(text)
 
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds many queries in one forward pass, reusing and filling the shared query cache
+
+        Args:
+              texts: Query strings
+        Returns:
+              Float32 array of shape (len(texts), dimension)
+        """
+        cache = self.query_cache
+        normalized = [cache.normalize(text) for text in texts]
+        found = {text: cache.get(text) for text in dict.fromkeys(normalized)}
+        missing = [text for text, vector in found.items() if vector is None]
+        if missing:
+            for text, vector in zip(missing, self._embedding.embed_documents(missing)):
+                cache.put(text, vector)
+                found[text] = np.asarray(vector, dtype=np.float32)
+        return np.stack([found[text] for text in normalized]).astype(np.float32, copy=False)
+
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Generates embedding vectors for a list of text strings
@@ -72,12 +362,11 @@ class EmbeddingManager:
 
     def get_embedding_dimension(self) -> int:
         """
-        Calculates the dimension size of the embeddings produced by the current model
+        Reads the dimension size of the embeddings produced by the current model from its metadata
 
         Args:
               No arguments
         Returns:
               Integer representing the length of the embedding vector
         """
-        sample_embedding = self.embed_text("earth")
-        return len(sample_embedding)
\ No newline at end of file
+        return self._model.dimension
\ No newline at end of file
@@ -0,0 +1,223 @@
+from typing import List, Dict, Optional
+from pathlib import Path
+import threading
+import sqlite3
+import hashlib
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+
+
+class EmbeddingCache:
+    """
+    Disk-backed float32 vector cache in SQLite, keyed by (model, normalize flag, text) with
+    least-recently-used eviction once the stored vectors exceed a size budget
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        Opens (or creates) the cache database
+
+        Args:
+              path: Location of the SQLite file (optional)
+              max_bytes: Budget for stored vector bytes (optional)
+        Returns:
+              None
+        """
+        self.path = Path(path or settings.EMBEDDING_CACHE_PATH)
+        self.max_bytes = max_bytes or settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, normalize: bool, text: str) -> bytes:
+        """
+        Builds the cache key of a text for a given model configuration
+
+        Args:
+              model_name: Embedding model name
+              normalize: Whether vectors are L2-normalized
+              text: Embedded text
+        Returns:
+              16-byte digest
+        """
+        return hashlib.blake2b(
+            f"{model_name}\0{int(normalize)}\0{text}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Looks up vectors and marks the found ones as recently used
+
+        Args:
+              keys: Cache keys
+        Returns:
+              Dictionary of found keys to float32 vectors
+        """
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            if found:
+                now = time.time_ns()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]) -> None:
+        """
+        Stores vectors and evicts the least recently used ones when over budget
+
+        Args:
+              items: Dictionary of cache keys to vectors
+        Returns:
+              None
+        """
+        if not items:
+            return
+        now = time.time_ns()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+        keys = [row[0] for row in rows]
+        with self._lock:
+            # A replaced row gives back its old size
+            replaced = 0
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._bytes += sum(len(row[1]) for row in rows) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """
+        Deletes least recently used vectors until the cache is at 90% of its budget; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used").fetchall()
+        total = sum(size for _, size in rows)
+        victims = []
+        for key, size in rows:
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._bytes = total
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings adapter that only sends texts missing from the EmbeddingCache to the model
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, model_name: str, normalize: bool):
+        """
+        Wraps an embeddings implementation with a cache
+
+        Args:
+              base: Embeddings computing the vectors
+              cache: EmbeddingCache storing them
+              model_name: Model name used in cache keys
+              normalize: Normalize flag used in cache keys
+        Returns:
+              None
+        """
+        self.base = base
+        self.cache = cache
+        self.model_name = model_name
+        self.normalize = normalize
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts, computing only the vectors not found in the cache
+
+        Args:
+              texts: List of input strings
+        Returns:
+              List of embeddings, one per text
+        """
+        keys = [self.cache.key(self.model_name, self.normalize, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), (np.asarray(v, dtype=np.float32) for v in vectors)))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query with the underlying model
+
+        Args:
+              text: Query string
+        Returns:
+              Query embedding
+        """
+        return self.base.embed_query(text)
+
+
+def open_cache() -> Optional[EmbeddingCache]:
+    """
+    Opens the configured cache, or returns None when it is disabled or its location is not writable
+
+    Args:
+          No arguments
+    Returns:
+          EmbeddingCache instance or None
+    """
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    try:
+        return EmbeddingCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Embedding cache disabled: {e}")
+        return None
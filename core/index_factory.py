@@ -0,0 +1,270 @@
+from typing import Iterable
+import math
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+_SCALAR_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# k-means wants roughly this many training points per centroid
+_POINTS_PER_CENTROID = 39
+
+
+def index_type(index: faiss.Index) -> str:
+    """
+    Names the kind of a FAISS index
+
+    Args:
+          index: FAISS index
+    Returns:
+          One of INDEX_TYPES
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, (faiss.IndexIVFFlat, faiss.IndexIVFScalarQuantizer)):
+        return "ivf_flat"
+    return "flat"
+
+
+def index_storage(index: faiss.Index) -> str:
+    """
+    Names the precision vectors are stored at in a flat, IVF or HNSW index
+
+    Args:
+          index: FAISS index
+    Returns:
+          One of STORAGE_TYPES
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "float16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+    return "float32"
+
+
+def is_lossy(index: faiss.Index) -> bool:
+    """
+    Checks whether the index keeps only an approximation of each vector (scalar or product quantized)
+
+    Args:
+          index: FAISS index
+    Returns:
+          True for reduced-precision storage and IVF-PQ
+    """
+    return index_type(index) == "ivf_pq" or index_storage(index) != "float32"
+
+
+def _nlist(count: int) -> int:
+    """
+    Picks the number of IVF cells: FAISS_NLIST, or about 4 * sqrt(n) capped so k-means has enough points
+
+    Args:
+          count: Number of training vectors
+    Returns:
+          Number of inverted lists
+    """
+    nlist = settings.FAISS_NLIST or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // _POINTS_PER_CENTROID))
+
+
+def _pq_m(dimension: int) -> int:
+    """
+    Picks the number of PQ sub-quantizers: FAISS_PQ_M, or the largest divisor of the dimension
+    giving at least 4 dimensions per sub-vector
+
+    Args:
+          dimension: Vector dimension
+    Returns:
+          Number of sub-quantizers
+    """
+    if settings.FAISS_PQ_M:
+        return settings.FAISS_PQ_M
+    return next(m for m in range(dimension // 4, 0, -1) if dimension % m == 0)
+
+
+def min_training_vectors(kind: str) -> int:
+    """
+    Number of vectors below which an index type cannot be trained sensibly
+
+    Args:
+          kind: One of INDEX_TYPES
+    Returns:
+          Minimum number of vectors
+    """
+    if kind == "ivf_pq":
+        return max(_POINTS_PER_CENTROID * 2 ** settings.FAISS_PQ_NBITS, _POINTS_PER_CENTROID)
+    if kind == "ivf_flat":
+        return _POINTS_PER_CENTROID
+    return 0
+
+
+def build_index(vectors: np.ndarray, kind: str = None, storage: str = None) -> faiss.Index:
+    """
+    Builds, trains and fills an L2 index of the requested type and storage precision; all types
+    rank by the same squared L2 distance as LangChain's default flat index
+
+    Args:
+          vectors: Float32 array of shape (n, dimension)
+          kind: One of INDEX_TYPES (default from settings)
+          storage: One of STORAGE_TYPES (default from settings); float16 and int8 use a scalar quantizer
+    Returns:
+          FAISS index holding the vectors at positions 0..n-1
+    """
+    kind = kind or settings.FAISS_INDEX_TYPE
+    storage = storage or settings.FAISS_STORAGE
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index type: {kind}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unsupported vector storage: {storage}")
+    if kind == "ivf_pq" and storage != "float32":
+        print(f"ivf_pq already compresses vectors, ignoring {storage} storage")
+        storage = "float32"
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+
+    if count < min_training_vectors(kind):
+        print(f"{count} vectors are too few to train a {kind} index, using flat")
+        kind = "flat"
+
+    qtype = _SCALAR_QUANTIZERS.get(storage)
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dimension) if qtype is None else faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_L2)
+    elif kind == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dimension, settings.FAISS_HNSW_M)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, qtype, settings.FAISS_HNSW_M)
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+    else:
+        quantizer = faiss.IndexFlatL2(dimension)
+        nlist = _nlist(count)
+        if kind == "ivf_pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_m(dimension), settings.FAISS_PQ_NBITS)
+        elif qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, qtype, faiss.METRIC_L2)
+        # The index owns the quantizer from here on; keeps SWIG from freeing it with this frame
+        index.own_fields = True
+        quantizer.this.disown()
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index: faiss.Index) -> faiss.Index:
+    """
+    Sets the query-time knobs (nprobe for IVF, efSearch for HNSW) from settings
+
+    Args:
+          index: FAISS index
+    Returns:
+          The same index
+    """
+    kind = index_type(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = settings.FAISS_NPROBE
+    elif kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+    return index
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """
+    Reads every stored vector back (exactly for float32 flat, IVF and HNSW, approximately for IVF-PQ
+    and reduced-precision storage)
+
+    Args:
+          index: FAISS index
+    Returns:
+          Float32 array of shape (ntotal, dimension) in position order
+    """
+    if index_type(index) in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def remove_positions(index: faiss.Index, positions: Iterable[int], vectors: np.ndarray = None) -> faiss.Index:
+    """
+    Removes vectors and shifts the later ones down so positions stay contiguous, which is what
+    LangChain's position -> id map expects
+
+    Args:
+          index: FAISS index
+          positions: Positions to remove
+          vectors: Exact vectors of every position, re-added instead of the index's approximations (optional)
+    Returns:
+          Index without the removed vectors; the input index itself for flat indexes
+    """
+    positions = np.fromiter(positions, dtype=np.int64)
+    if index_type(index) == "flat":
+        # IndexFlat compacts in place, keeping the order
+        index.remove_ids(positions)
+        return index
+
+    # HNSW cannot remove, and IVF keeps the original labels, so re-add the survivors to an
+    # empty copy of the trained index
+    keep = np.ones(index.ntotal, dtype=bool)
+    keep[positions] = False
+    survivors = (reconstruct_all(index) if vectors is None else np.asarray(vectors, dtype=np.float32))[keep]
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    rebuilt.add(survivors)
+    return apply_search_params(rebuilt)
+
+
+def reconstruct_positions(index: faiss.Index, positions: np.ndarray) -> np.ndarray:
+    """
+    Reads back the vectors stored at some positions
+
+    Args:
+          index: FAISS index
+          positions: int64 array of positions
+    Returns:
+          Float32 array of shape (len(positions), dimension)
+    """
+    if index_type(index) in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(index)
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+    return index.reconstruct_batch(np.ascontiguousarray(positions, dtype=np.int64))
+
+
+def search_parameters(index: faiss.Index, selector: faiss.IDSelector = None) -> faiss.SearchParameters:
+    """
+    Builds per-query search parameters carrying the configured nprobe / efSearch and an id selector
+
+    Args:
+          index: FAISS index
+          selector: Restricts the search to these positions (optional)
+    Returns:
+          SearchParameters matching the index type
+    """
+    kind = index_type(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = faiss.extract_index_ivf(index).nprobe
+    elif kind == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = faiss.downcast_index(index).hnsw.efSearch
+    else:
+        params = faiss.SearchParameters()
+    if selector is not None:
+        params.sel = selector
+    return params
@@ -0,0 +1,195 @@
+from typing import List, Optional
+from pathlib import Path
+import threading
+import shutil
+import time
+import uuid
+import os
+
+from config.settings import settings
+
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+_version_lock = threading.Lock()
+_last_version_ns = 0
+
+
+def current_version(root: Path) -> Optional[str]:
+    """
+    Reads the version the CURRENT pointer of an index directory names
+
+    Args:
+          root: Index directory
+    Returns:
+          Version name, or None for an unversioned (pre-versioning) directory
+    """
+    try:
+        return (Path(root) / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_path(root: Path, version: str) -> Path:
+    """
+    Directory holding one version of an index
+
+    Args:
+          root: Index directory
+          version: Version name
+    Returns:
+          Path of <root>/versions/<version>
+    """
+    return Path(root) / VERSIONS_DIR / version
+
+
+def resolve(root: Path) -> Path:
+    """
+    Directory to read an index from: the current version, or the root itself when unversioned
+
+    Args:
+          root: Index directory
+    Returns:
+          Path holding index.faiss
+    """
+    version = current_version(root)
+    return version_path(root, version) if version else Path(root)
+
+
+def index_exists(root: Path) -> bool:
+    """
+    Checks whether an index has been saved, versioned or not
+
+    Args:
+          root: Index directory
+    Returns:
+          True if the current version (or the root) holds index.faiss
+    """
+    return (resolve(root) / "index.faiss").exists()
+
+
+def new_version() -> str:
+    """
+    Names a new version; names sort in creation order, also within one second and across DST
+    changes, because the UTC nanosecond timestamp comes before the random suffix and never repeats
+    within a process
+
+    Args:
+          No arguments
+    Returns:
+          Version name such as 20260101T120000.123456789-3f2a9c
+    """
+    global _last_version_ns
+    with _version_lock:
+        ns = _last_version_ns = max(time.time_ns(), _last_version_ns + 1)
+    seconds, fraction = divmod(ns, 1_000_000_000)
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(seconds))}.{fraction:09d}-{uuid.uuid4().hex[:6]}"
+
+
+def publish(root: Path, version: str) -> None:
+    """
+    Points CURRENT at a fully written version; the rename is atomic, so readers see either the old
+    version or the new one
+
+    Args:
+          root: Index directory
+          version: Version name
+    Returns:
+          None
+    """
+    root = Path(root)
+    tmp = root / f"{CURRENT_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / CURRENT_FILE)
+
+
+def prune(root: Path, keep: int = None) -> List[str]:
+    """
+    Deletes all but the newest versions; the current one is always kept. Processes still reading a
+    deleted version keep their open files until they reload
+
+    Args:
+          root: Index directory
+          keep: Number of versions to keep (default INDEX_VERSIONS_KEEP)
+    Returns:
+          Names of the deleted versions
+    """
+    keep = settings.INDEX_VERSIONS_KEEP if keep is None else keep
+    versions_dir = Path(root) / VERSIONS_DIR
+    if keep <= 0 or not versions_dir.is_dir():
+        return []
+    current = current_version(root)
+    versions = sorted(child.name for child in versions_dir.iterdir() if child.is_dir())
+    removed = [version for version in versions[:-keep] if version != current]
+    for version in removed:
+        shutil.rmtree(versions_dir / version, ignore_errors=True)
+    return removed
+
+
+class HotReloader:
+    """
+    Background thread that polls an index's CURRENT pointer and swaps newly published versions into a
+    running store; queries keep being answered from the old version while the new one loads
+    """
+
+    def __init__(self, store, interval: float = None):
+        """
+        Binds the reloader to a store
+
+        Args:
+              store: VectorStoreManager or ShardedVectorStore with a reload_if_changed() method
+              interval: Seconds between checks (default INDEX_RELOAD_INTERVAL; 0 disables)
+        Returns:
+              None
+        """
+        self.store = store
+        self.interval = settings.INDEX_RELOAD_INTERVAL if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "HotReloader":
+        """
+        Starts polling unless the interval is 0
+
+        Args:
+              No arguments
+        Returns:
+              The reloader itself
+        """
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="index-hot-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops polling
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """
+        Polling loop; a failed reload leaves the old version in service and is retried next time
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.reload_if_changed()
+            except Exception as e:
+                print(f"Index reload failed, still serving the previous version: {e}")
@@ -0,0 +1,435 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Iterable
+from pathlib import Path
+import itertools
+import threading
+import queue
+import time
+import uuid
+
+from langchain_core.documents import Document
+
+from config.settings import settings
+from core.document_processing import DocumentProcessor
+from core.meta_extraction import MetaExtraction
+from core.chunking import Chunking
+from core.dedup import ChunkDeduplicator
+from core.vector_store import VectorStoreManager
+
+
+_END_OF_STREAM = None
+
+# MetaExtraction builds its prompt from the first sections of a paper
+_CONTEXT_SECTIONS = 3
+
+
+def _parse_pdf(path: str) -> Tuple[str, List[Document], Dict, float]:
+    """
+    Parses a single PDF into section documents; runs inside a worker process
+
+    Args:
+          path: File path string to the PDF
+    Returns:
+          Tuple of (path, section documents, raw pdf metadata, seconds spent)
+    """
+    start = time.perf_counter()
+    processor = DocumentProcessor(path=path)
+    docs = processor.process()
+    pdf_metadata = processor.pdf_metadata
+    return path, docs, pdf_metadata, time.perf_counter() - start
+
+
+@dataclass
+class StageStats:
+    """
+    Accumulated busy time and item count for one pipeline stage
+    """
+    name: str
+    seconds: float = 0.0
+    items: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, items: int = 1) -> None:
+        """
+        Adds one unit of work to the stage totals
+
+        Args:
+              seconds: Time spent on the work
+              items: Number of items the work produced
+        Returns:
+              None
+        """
+        with self._lock:
+            self.seconds += seconds
+            self.items += items
+
+
+class IngestionPipeline:
+    """
+    Staged, bounded-queue ingestion: parse (process pool) -> metadata + chunking (thread pool) -> batched embedding
+    """
+
+    def __init__(
+            self,
+            vector_store: VectorStoreManager,
+            parse_workers: int = None,
+            meta_workers: int = None,
+            embed_batch_size: int = None,
+            queue_size: int = None
+    ):
+        """
+        Initializes the pipeline with the target vector store and concurrency limits
+
+        Args:
+              vector_store: VectorStoreManager receiving the chunk batches
+              parse_workers: Number of PDF parsing processes (optional)
+              meta_workers: Number of concurrent metadata extraction calls (optional)
+              embed_batch_size: Minimum number of chunks gathered per embedding call (optional)
+              queue_size: Capacity of the queues between stages (optional)
+        Returns:
+              None
+        """
+        self.vector_store = vector_store
+        self.parse_workers = max(1, parse_workers or settings.INGEST_PARSE_WORKERS)
+        self.meta_workers = max(1, meta_workers or settings.INGEST_META_WORKERS)
+        self.embed_batch_size = max(1, embed_batch_size or settings.INGEST_EMBED_BATCH)
+        self.queue_size = max(1, queue_size or settings.INGEST_QUEUE_SIZE)
+
+        self.stats = {
+            name: StageStats(name)
+            for name in ("parse", "metadata", "chunk", "dedup", "embed")
+        }
+        self.deduplicator = ChunkDeduplicator() if settings.DEDUP_ENABLED else None
+        self.failures: List[Tuple[str, str]] = []
+        self.empty: List[str] = []
+        self.truncation = {"truncated": 0, "tokens_dropped": 0}
+        self._lock = threading.Lock()
+        self.indexed: Dict[str, Dict] = {}
+        self._file_hashes: Dict[str, str] = {}
+        if settings.INGEST_STREAMING_PARSE and settings.PRESERVE_LAYOUT:
+            print("PRESERVE_LAYOUT is ignored with INGEST_STREAMING_PARSE; sections are parsed with flat normalization")
+
+    def _fail(self, path: str, error: Exception) -> None:
+        """
+        Records a paper that could not be ingested
+
+        Args:
+              path: File path of the failed paper
+              error: Exception raised while processing it
+        Returns:
+              None
+        """
+        print(f"Failed to ingest {path}: {error}")
+        with self._lock:
+            self.failures.append((path, repr(error)))
+
+    def _parse_stage(self, pdf_paths: Iterable[Path], parsed_queue: queue.Queue) -> None:
+        """
+        Parses PDFs in a process pool, keeping a bounded number of files in flight; with
+        INGEST_STREAMING_PARSE the paths are handed on unparsed, for the enrichment threads to stream
+
+        Args:
+              pdf_paths: Paths of the PDFs to ingest
+              parsed_queue: Queue receiving (path, section documents, pdf metadata), or (path, None, None) to stream
+        Returns:
+              None
+        """
+        paths = iter(pdf_paths)
+        try:
+            if settings.INGEST_STREAMING_PARSE:
+                for path in paths:
+                    parsed_queue.put((str(path), None, None))
+                return
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+                in_flight = {
+                    pool.submit(_parse_pdf, str(path)): str(path)
+                    for path in itertools.islice(paths, self.parse_workers * 2)
+                }
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = in_flight.pop(future)
+                        try:
+                            _, docs, pdf_metadata, elapsed = future.result()
+                        except Exception as e:
+                            self._fail(path, e)
+                        else:
+                            self.stats["parse"].record(elapsed)
+                            parsed_queue.put((path, docs, pdf_metadata))
+
+                        next_path = next(paths, None)
+                        if next_path is not None:
+                            in_flight[pool.submit(_parse_pdf, str(next_path))] = str(next_path)
+        finally:
+            for _ in range(self.meta_workers):
+                parsed_queue.put(_END_OF_STREAM)
+
+    def _enrich_stage(self, parsed_queue: queue.Queue, chunk_queue: queue.Queue) -> None:
+        """
+        Runs metadata extraction and chunking for parsed papers until the parse stage is exhausted
+
+        Args:
+              parsed_queue: Queue of (path, section documents, pdf metadata)
+              chunk_queue: Queue receiving (path, chunk documents)
+        Returns:
+              None
+        """
+        try:
+            while True:
+                item = parsed_queue.get()
+                if item is _END_OF_STREAM:
+                    return
+                path, docs, pdf_metadata = item
+
+                try:
+                    if docs is None:
+                        chunks = self._stream_paper(path)
+                    else:
+                        start = time.perf_counter()
+                        enriched_docs = MetaExtraction(pdf_metadata, docs).update_metadata()
+                        self.stats["metadata"].record(time.perf_counter() - start)
+
+                        start = time.perf_counter()
+                        chunks = self._chunk(enriched_docs)
+                        self.stats["chunk"].record(time.perf_counter() - start, len(chunks))
+                except Exception as e:
+                    self._fail(path, e)
+                    continue
+
+                chunk_queue.put((path, chunks))
+        finally:
+            chunk_queue.put(_END_OF_STREAM)
+
+    def _chunk(self, docs: List[Document]) -> List[Document]:
+        """
+        Splits section documents into chunks; with CHUNK_TRUNCATION_CHECK, character-sized chunks are
+        also tokenized to record how many exceed the model limit
+
+        Args:
+              docs: Section documents carrying the paper metadata
+        Returns:
+              List of chunk documents
+        """
+        chunker = Chunking(document=docs, embedding_manager=self.vector_store.embedding_manager)
+        chunks = chunker.intiate_chunk()
+        if settings.CHUNK_TRUNCATION_CHECK and chunker.chunk_unit == "chars":
+            self._record_truncation(chunker.truncation_report(chunks))
+        return chunks
+
+    def _stream_paper(self, path: str) -> List[Document]:
+        """
+        Parses, enriches and chunks a paper section by section in this thread: metadata is extracted
+        from the first sections, and every later section is chunked as soon as the parser closes it,
+        so only the paper's chunks are held, never its pages or full text
+
+        Args:
+              path: File path of the PDF
+        Returns:
+              List of chunk documents
+        """
+        processor = DocumentProcessor(path=path)
+        sections = processor.stream_sections()
+        start = time.perf_counter()
+        head = list(itertools.islice(sections, _CONTEXT_SECTIONS))
+        parse_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        head = MetaExtraction(processor.pdf_metadata, head).update_metadata()
+        self.stats["metadata"].record(time.perf_counter() - start)
+        paper_metadata = {key: value for key, value in head[0].metadata.items() if key != "section"} if head else {}
+
+        chunks: List[Document] = []
+        chunk_seconds = 0.0
+        start = time.perf_counter()
+        for section in itertools.chain(head, sections):
+            section.metadata.update(paper_metadata)
+            chunk_start = time.perf_counter()
+            chunks.extend(self._chunk([section]))
+            chunk_seconds += time.perf_counter() - chunk_start
+        # Parsing the remaining pages is interleaved with chunking them
+        self.stats["parse"].record(parse_seconds + time.perf_counter() - start - chunk_seconds)
+        self.stats["chunk"].record(chunk_seconds, len(chunks))
+        return chunks
+
+    def _record_truncation(self, report: Dict) -> None:
+        """
+        Accumulates how many chunks exceed the embedding model's sequence limit
+
+        Args:
+              report: Output of Chunking.truncation_report
+        Returns:
+              None
+        """
+        with self._lock:
+            self.truncation["truncated"] += report["truncated"]
+            self.truncation["tokens_dropped"] += report["tokens_dropped"]
+            self.truncation["max_seq_length"] = report["max_seq_length"]
+
+    def _embed_stage(self, chunk_queue: queue.Queue) -> int:
+        """
+        Gathers chunks from many papers into large batches and adds them to the vector store
+
+        Args:
+              chunk_queue: Queue of (path, chunk documents)
+        Returns:
+              Number of papers that contributed at least one chunk
+        """
+        batch: List[Document] = []
+        batch_ids: List[str] = []
+        papers = 0
+        open_producers = self.meta_workers
+
+        while open_producers:
+            item = chunk_queue.get()
+            if item is _END_OF_STREAM:
+                open_producers -= 1
+                continue
+
+            path, chunks = item
+            if self.deduplicator is not None:
+                start = time.perf_counter()
+                chunks = self.deduplicator.filter(chunks)
+                self.stats["dedup"].record(time.perf_counter() - start, len(chunks))
+
+            prefix = self._file_hashes.get(path) or uuid.uuid4().hex
+            ids = [f"{prefix[:16]}-{i}" for i in range(len(chunks))]
+            paper_id = chunks[0].metadata.get("paper_id") if chunks else None
+            self.indexed[path] = {"chunk_ids": ids, "paper_id": paper_id}
+
+            if not chunks:
+                # Recorded so the manifest does not retry it, but not counted as ingested
+                self.empty.append(path)
+                continue
+            batch.extend(chunks)
+            batch_ids.extend(ids)
+            papers += 1
+            if len(batch) >= self.embed_batch_size:
+                self._flush(batch, batch_ids)
+                batch, batch_ids = [], []
+
+        if batch:
+            self._flush(batch, batch_ids)
+        return papers
+
+    def _flush(self, batch: List[Document], ids: List[str]) -> None:
+        """
+        Embeds and indexes one batch of chunks
+
+        Args:
+              batch: Chunk documents to add to the vector store
+              ids: Vector store ids for the chunks
+        Returns:
+              None
+        """
+        start = time.perf_counter()
+        self.vector_store.add_documents(batch, ids=ids)
+        self.stats["embed"].record(time.perf_counter() - start, len(batch))
+
+    def run(self, pdf_paths: List[Path], file_hashes: Dict[str, str] = None) -> Dict:
+        """
+        Runs all stages concurrently over the given PDFs and prints a throughput report
+
+        Args:
+              pdf_paths: Paths of the PDFs to ingest
+              file_hashes: Content hash per path string, used to derive stable chunk ids (optional)
+        Returns:
+              Dictionary with paper/chunk counts, rates, per-stage seconds, indexed chunk ids and failures
+        """
+        self._file_hashes = file_hashes or {}
+        parsed_queue = queue.Queue(maxsize=self.queue_size)
+        chunk_queue = queue.Queue(maxsize=self.queue_size)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=self._parse_stage, args=(pdf_paths, parsed_queue), daemon=True)]
+        workers += [
+            threading.Thread(target=self._enrich_stage, args=(parsed_queue, chunk_queue), daemon=True)
+            for _ in range(self.meta_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            papers = self._embed_stage(chunk_queue)
+            for worker in workers:
+                worker.join()
+        finally:
+            # Embedding workers live for the whole run, not for each flush
+            self.vector_store.embedding_manager.close_worker_pool()
+        wall = time.perf_counter() - start
+
+        report = self._report(papers, wall)
+        self._print_report(report)
+        return report
+
+    def _report(self, papers: int, wall: float) -> Dict:
+        """
+        Builds the throughput report for a finished run
+
+        Args:
+              papers: Number of papers indexed
+              wall: Wall-clock seconds of the run
+        Returns:
+              Dictionary describing the run
+        """
+        chunks = self.stats["embed"].items
+        return {
+            "papers": papers,
+            "chunks": chunks,
+            "failed": len(self.failures),
+            "empty": len(self.empty),
+            "wall_seconds": wall,
+            "papers_per_second": papers / wall if wall else 0.0,
+            "chunks_per_second": chunks / wall if wall else 0.0,
+            "stage_seconds": {name: stat.seconds for name, stat in self.stats.items()},
+            "truncation": dict(self.truncation),
+            "embedding": dict(self.vector_store.embedding_manager.stats),
+            "dedup": dict(self.deduplicator.stats) if self.deduplicator else None,
+            "indexed": dict(self.indexed),
+            "failures": list(self.failures),
+        }
+
+    @staticmethod
+    def _print_report(report: Dict) -> None:
+        """
+        Prints a human readable summary of a pipeline run
+
+        Args:
+              report: Dictionary produced by _report
+        Returns:
+              None
+        """
+        print("=" * 80)
+        print(
+            f"Ingested {report['papers']} papers / {report['chunks']} chunks "
+            f"in {report['wall_seconds']:.1f}s "
+            f"({report['papers_per_second']:.2f} papers/s, {report['chunks_per_second']:.1f} chunks/s)"
+        )
+        busy_total = sum(report["stage_seconds"].values()) or 1.0
+        for name, seconds in report["stage_seconds"].items():
+            print(f"  {name:<9} {seconds:8.1f}s busy  ({seconds / busy_total:5.1%} of stage time)")
+        dedup = report["dedup"]
+        if dedup and dedup["chunks"]:
+            print(
+                f"  dropped {dedup['dropped']} of {dedup['chunks']} chunks as near-duplicates "
+                f"({dedup['dropped'] / dedup['chunks']:.1%} fewer vectors, "
+                f"{dedup['chars_dropped'] / max(1, dedup['chars']):.1%} less stored text)"
+            )
+        embedding = report["embedding"]
+        if embedding["seconds"]:
+            print(
+                f"  embedding model: {embedding['texts'] / embedding['seconds']:.1f} texts/s, "
+                f"{embedding['tokens'] / embedding['seconds']:.0f} tokens/s"
+            )
+        truncation = report["truncation"]
+        if truncation["truncated"]:
+            print(
+                f"  {truncation['truncated']} of {report['chunks']} chunks exceed the model's "
+                f"{truncation['max_seq_length']} word-piece limit; "
+                f"{truncation['tokens_dropped']} tokens were stored but never embedded"
+            )
+        if report["empty"]:
+            print(f"  {report['empty']} paper(s) produced no chunks")
+        if report["failed"]:
+            print(f"  {report['failed']} paper(s) failed")
+        print("=" * 80)
@@ -0,0 +1,248 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from config.settings import settings
+from core.document_processing import DocumentProcessor
+from core.onnx_backend import backend_tag
+from core.sharded_store import shard_layout
+
+
+MANIFEST_PATH = Path(settings.INGEST_MANIFEST_FILE)
+
+
+@dataclass
+class IngestionPlan:
+    """
+    Work required to bring the index in line with the PDFs on disk
+    """
+    to_process: List[Path] = field(default_factory=list)
+    stale: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    hashes: Dict[str, str] = field(default_factory=dict)
+    duplicates: Dict[str, str] = field(default_factory=dict)
+    rebuild: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        Whether the index is already up to date
+
+        Args:
+              No arguments
+        Returns:
+              True if there is nothing to process or drop
+        """
+        return not self.to_process and not self.removed
+
+
+class IngestionManifest:
+    """
+    Persists, per ingested file, the content hash and the settings its chunks were built with
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Initializes the manifest and loads any existing entries from disk
+
+        Args:
+              path: Location of the manifest JSON file (optional)
+        Returns:
+              None
+        """
+        self.path = Path(path) if path else MANIFEST_PATH
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """
+        Reads the manifest file if it exists
+
+        Args:
+              No arguments
+        Returns:
+              Dictionary mapping file keys to manifest entries
+        """
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def save(self) -> None:
+        """
+        Atomically writes the manifest to disk
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def fingerprint() -> Dict:
+        """
+        Settings that, when changed, invalidate previously produced chunks and vectors
+
+        Args:
+              No arguments
+        Returns:
+              Dictionary of parser version and mode, chunk settings, embedding model and backend, index type
+              and shard layout
+        """
+        return {
+            "parser_version": DocumentProcessor.PARSER_VERSION,
+            # Streaming parses always use flat normalization, whatever PRESERVE_LAYOUT says
+            "preserve_layout": settings.PRESERVE_LAYOUT and not settings.INGEST_STREAMING_PARSE,
+            "chunk_unit": settings.CHUNK_UNIT,
+            "chunk_size": settings.CHUNK_TOKEN_SIZE if settings.CHUNK_UNIT == "tokens" else settings.CHUNK_SIZE,
+            "chunk_overlap": settings.CHUNK_TOKEN_OVERLAP if settings.CHUNK_UNIT == "tokens" else settings.CHUNK_OVERLAP,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding_backend": backend_tag(),
+            "index_type": settings.FAISS_INDEX_TYPE,
+            "shard_layout": shard_layout(),
+        }
+
+    @staticmethod
+    def file_hash(path: Path) -> str:
+        """
+        Computes the SHA-256 of a file's content
+
+        Args:
+              path: Path of the file to hash
+        Returns:
+              Hex digest string
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _current_hash(self, key: str, path: Path) -> str:
+        """
+        Returns the content hash of a file, reusing the stored one when size and mtime are unchanged
+
+        Args:
+              key: Manifest key of the file
+              path: Path of the file
+        Returns:
+              Hex digest string
+        """
+        stat = path.stat()
+        entry = self.entries.get(key)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["sha256"]
+        return self.file_hash(path)
+
+    def plan(self, pdf_paths: List[Path]) -> IngestionPlan:
+        """
+        Compares the files on disk with the manifest and decides what must be (re)processed
+
+        Args:
+              pdf_paths: Paths of the PDFs currently present
+        Returns:
+              IngestionPlan describing new, changed, deleted and duplicate files
+        """
+        plan = IngestionPlan()
+        fingerprint = self.fingerprint()
+        present = set()
+
+        for path in pdf_paths:
+            key = str(path)
+            present.add(key)
+            plan.hashes[key] = self._current_hash(key, path)
+
+        # Chunk ids derive from the content hash, so byte-identical copies are indexed once; a copy
+        # that is already indexed keeps that role
+        owners: Dict[str, str] = {}
+        for key, sha in plan.hashes.items():
+            if self.entries.get(key, {}).get("sha256") == sha:
+                owners.setdefault(sha, key)
+        for key, sha in plan.hashes.items():
+            owners.setdefault(sha, key)
+
+        for path in pdf_paths:
+            key = str(path)
+            sha = plan.hashes[key]
+            if owners[sha] != key:
+                plan.duplicates[key] = owners[sha]
+                continue
+
+            entry = self.entries.get(key)
+            if entry is None:
+                plan.to_process.append(path)
+            elif entry.get("sha256") != sha or any(entry.get(k) != v for k, v in fingerprint.items()):
+                plan.to_process.append(path)
+                plan.stale.append(key)
+
+        plan.removed = [key for key in self.entries if key not in present or key in plan.duplicates]
+
+        # Nothing from the old index survives, so start from an empty store instead of deleting every vector
+        plan.rebuild = len(plan.stale) + len(plan.removed) == len(self.entries)
+        return plan
+
+    def chunk_ids(self, keys: List[str]) -> List[str]:
+        """
+        Collects the vector store ids of the chunks produced from the given files
+
+        Args:
+              keys: Manifest keys of the files
+        Returns:
+              List of chunk ids
+        """
+        ids = []
+        for key in keys:
+            ids.extend(self.entries.get(key, {}).get("chunk_ids", []))
+        return ids
+
+    def record(self, path: str, sha256: str, chunk_ids: List[str], paper_id: Optional[str] = None) -> None:
+        """
+        Stores the manifest entry for a successfully indexed file
+
+        Args:
+              path: File path string used as manifest key
+              sha256: Content hash of the file
+              chunk_ids: Vector store ids of the file's chunks
+              paper_id: Paper identifier extracted from the file (optional)
+        Returns:
+              None
+        """
+        stat = Path(path).stat()
+        self.entries[path] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            **self.fingerprint(),
+            "paper_id": paper_id,
+            "chunk_ids": chunk_ids,
+        }
+
+    def remove(self, keys: List[str]) -> None:
+        """
+        Drops manifest entries
+
+        Args:
+              keys: Manifest keys of the files to forget
+        Returns:
+              None
+        """
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Forgets every entry, used when the index is rebuilt from scratch
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        self.entries = {}
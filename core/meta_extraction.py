@@ -2,6 +2,7 @@
 
 from pathlib import Path
 from typing import List, Dict
+import threading
 import json
 
 from langchain_groq import ChatGroq
@@ -14,6 +15,10 @@ from core.structure import ResearchPaper
 
 METADATA_PATH = Path(settings.METADATA_FILE)
 
+# Serialises read-modify-write cycles on METADATA_PATH when several
+# extractions run concurrently during ingestion
+_METADATA_LOCK = threading.Lock()
+
 
 class MetaExtraction:
     """
@@ -86,16 +91,17 @@ class MetaExtraction:
         Returns:
               None
         """
-        store = self._load_metadata()
+        with _METADATA_LOCK:
+            store = self._load_metadata()
 
-        for i, existing in enumerate(store):
-            if existing.get("paper_id") == record.get("paper_id"):
-                store[i] = record
-                self._save_metadata(store)
-                return
+            for i, existing in enumerate(store):
+                if existing.get("paper_id") == record.get("paper_id"):
+                    store[i] = record
+                    self._save_metadata(store)
+                    return
 
-        store.append(record)
-        self._save_metadata(store)
+            store.append(record)
+            self._save_metadata(store)
 
     def _attach_metadata(self, metadata: dict) -> None:
         """
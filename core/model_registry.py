@@ -0,0 +1,96 @@
+from typing import Dict, Tuple, List
+import threading
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from core.onnx_backend import backend_tag, export_onnx_model
+from core.query_cache import QueryCache
+
+
+class LoadedModel:
+    """
+    An embedding model loaded once per process, with the state every manager using it shares
+    """
+
+    def __init__(self, embedding: HuggingFaceEmbeddings):
+        """
+        Wraps a loaded model
+
+        Args:
+              embedding: LangChain HuggingFaceEmbeddings holding the sentence-transformers model
+        Returns:
+              None
+        """
+        self.embedding = embedding
+        # Fast tokenizers may not be driven from several threads at once
+        self.tokenizer_lock = threading.Lock()
+        self.query_cache = QueryCache()
+        self._dimension = None
+
+    @property
+    def dimension(self) -> int:
+        """
+        Retrieves the embedding size from the model's modules instead of embedding a probe text
+
+        Args:
+              No arguments
+        Returns:
+              Integer length of the embedding vectors
+        """
+        if self._dimension is None:
+            client = self.embedding._client
+            # Renamed in sentence-transformers 5; the old name still works but warns
+            getter = getattr(client, "get_embedding_dimension", None) or client.get_sentence_embedding_dimension
+            self._dimension = getter() or len(self.embedding.embed_query("earth"))
+        return self._dimension
+
+
+_MODELS: Dict[Tuple[str, str], LoadedModel] = {}
+_LOCK = threading.Lock()
+
+
+def get_model(model_name: str, backend: str = "torch", quantize: str = "") -> LoadedModel:
+    """
+    Returns the process-wide instance of a model, loading it on first use
+
+    Args:
+          model_name: HuggingFace model name or local path
+          backend: "torch" or "onnx"
+          quantize: int8 quantization config for the ONNX backend, empty for none
+    Returns:
+          LoadedModel shared by every caller asking for the same model and backend
+    """
+    key = (model_name, backend_tag(backend, quantize))
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+
+    with _LOCK:
+        # Another thread may have finished loading while this one waited
+        if key not in _MODELS:
+            model_path = model_name
+            model_kwargs = {"device": "cpu"}
+            if backend == "onnx":
+                model_path, onnx_kwargs = export_onnx_model(model_name, quantize)
+                model_kwargs.update(backend="onnx", model_kwargs=onnx_kwargs)
+            print(f"Loading embedding model {model_name} ({key[1]})")
+            _MODELS[key] = LoadedModel(
+                HuggingFaceEmbeddings(
+                    model_name=model_path,
+                    model_kwargs=model_kwargs,
+                    encode_kwargs={"normalize_embeddings": True}
+                )
+            )
+        return _MODELS[key]
+
+
+def loaded_models() -> List[Tuple[str, str]]:
+    """
+    Lists the models currently held by the registry
+
+    Args:
+          No arguments
+    Returns:
+          List of (model name, backend tag) pairs
+    """
+    return list(_MODELS)
@@ -0,0 +1,62 @@
+from typing import Dict, Tuple
+from pathlib import Path
+import re
+
+from config.settings import settings
+
+
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+def backend_tag(backend: str = None, quantize: str = None) -> str:
+    """
+    Names the backend configuration, used wherever vectors of different backends must not mix
+
+    Args:
+          backend: "torch" or "onnx" (optional)
+          quantize: int8 quantization config for the ONNX backend, empty for none (optional)
+    Returns:
+          Tag such as "torch", "onnx" or "onnx-int8_avx2"
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+    if backend != "onnx":
+        return backend
+    return f"onnx-int8_{quantize}" if quantize else "onnx"
+
+
+def export_onnx_model(model_name: str, quantize: str = None, export_dir: str = None) -> Tuple[str, Dict]:
+    """
+    Exports a sentence-transformers model to ONNX, and optionally to a dynamically int8-quantized
+    ONNX file, once; later calls reuse the exported files
+
+    Args:
+          model_name: HuggingFace model name or local path
+          quantize: One of QUANTIZATION_CONFIGS, empty for full precision (optional)
+          export_dir: Directory holding exported models (optional)
+    Returns:
+          Tuple of (path to load the model from, model_kwargs selecting the ONNX file)
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+    if quantize and quantize not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unsupported ONNX quantization config: {quantize}")
+
+    target = Path(export_dir or settings.EMBEDDING_ONNX_DIR) / re.sub(r"[^\w\-.]+", "__", model_name.strip("/"))
+    if not (target / "onnx" / "model.onnx").exists():
+        print(f"Exporting {model_name} to ONNX in {target}")
+        SentenceTransformer(model_name, backend="onnx", device="cpu").save_pretrained(str(target))
+
+    # Several ONNX files end up side by side, so the one to load is always named
+    if not quantize:
+        return str(target), {"file_name": "onnx/model.onnx"}
+
+    file_name = f"onnx/model_int8_{quantize}.onnx"
+    if not (target / file_name).exists():
+        print(f"Quantizing {model_name} to int8 ({quantize})")
+        model = SentenceTransformer(
+            str(target), backend="onnx", device="cpu", model_kwargs={"file_name": "onnx/model.onnx"}
+        )
+        export_dynamic_quantized_onnx_model(model, quantize, str(target), file_suffix=f"int8_{quantize}")
+    return str(target), {"file_name": file_name}
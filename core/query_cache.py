@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import threading
+import re
+
+import numpy as np
+
+from config.settings import settings
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe least-recently-used map from normalized query text to its embedding
+    """
+
+    def __init__(self, max_size: int = None):
+        """
+        Initializes an empty cache
+
+        Args:
+              max_size: Maximum number of cached queries, 0 disables caching (optional)
+        Returns:
+              None
+        """
+        self.max_size = settings.QUERY_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Builds the cache key of a query; whitespace differences do not change the embedding input
+
+        Args:
+              text: Query string
+        Returns:
+              Query with surrounding whitespace stripped and inner runs collapsed to one space
+        """
+        return _WHITESPACE.sub(" ", text).strip()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Looks up a query and marks it as most recently used
+
+        Args:
+              text: Query string
+        Returns:
+              Cached vector, or None on a miss
+        """
+        key = self.normalize(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector) -> None:
+        """
+        Stores a query vector, evicting the least recently used entry when full
+
+        Args:
+              text: Query string
+              vector: Query embedding
+        Returns:
+              None
+        """
+        if self.max_size <= 0:
+            return
+        key = self.normalize(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops every cached query and resets the counters
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Reports the cache size and hit rate
+
+        Args:
+              No arguments
+        Returns:
+              Dictionary with size, max_size, hits, misses and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
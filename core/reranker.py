@@ -0,0 +1,127 @@
+from typing import Dict, List, Tuple
+import threading
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from sentence_transformers import CrossEncoder
+
+from config.settings import settings
+
+
+_MODELS: Dict[Tuple[str, int], CrossEncoder] = {}
+_LOCK = threading.Lock()
+
+
+def get_cross_encoder(model_name: str, max_length: int) -> CrossEncoder:
+    """
+    Returns the process-wide instance of a cross-encoder, loading it on CPU on first use
+
+    Args:
+          model_name: HuggingFace model name or local path
+          max_length: Token limit of a (question, chunk) pair; longer chunks are truncated
+    Returns:
+          sentence-transformers CrossEncoder shared by every caller asking for the same model
+    """
+    key = (model_name, max_length)
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+
+    with _LOCK:
+        if key not in _MODELS:
+            print(f"Loading reranker model {model_name}")
+            _MODELS[key] = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        return _MODELS[key]
+
+
+class CrossEncoderReranker:
+    """
+    Second retrieval stage: a small cross-encoder reads the question together with each candidate
+    chunk and re-scores it, which ranks far better than comparing two separate embeddings. It runs
+    within a candidate budget and a time budget, so a slow CPU degrades to first-stage order
+    instead of delaying the answer
+    """
+
+    def __init__(
+            self,
+            model_name: str = None,
+            max_candidates: int = None,
+            time_budget_ms: float = None,
+            batch_size: int = None,
+            max_length: int = None
+    ):
+        """
+        Initializes the reranker; the model is loaded on the first rerank
+
+        Args:
+              model_name: Cross-encoder name or path (default RERANK_MODEL)
+              max_candidates: Most candidates scored per query (default RERANK_CANDIDATES)
+              time_budget_ms: Scoring stops before a batch that would end past this (default RERANK_TIME_BUDGET_MS)
+              batch_size: Pairs per forward pass (default RERANK_BATCH_SIZE)
+              max_length: Token limit per pair (default RERANK_MAX_LENGTH)
+        Returns:
+              None
+        """
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.max_candidates = max_candidates or settings.RERANK_CANDIDATES
+        self.time_budget_ms = settings.RERANK_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+        self.batch_size = max(1, batch_size or settings.RERANK_BATCH_SIZE)
+        self.max_length = max_length or settings.RERANK_MAX_LENGTH
+
+    @property
+    def model(self) -> CrossEncoder:
+        """
+        Retrieves the shared cross-encoder instance
+
+        Args:
+              No arguments
+        Returns:
+              sentence-transformers CrossEncoder
+        """
+        return get_cross_encoder(self.model_name, self.max_length)
+
+    def rerank(self, query: str, documents: List[Document], k: int) -> Tuple[List[Tuple[Document, float]], Dict]:
+        """
+        Scores candidates in batches, best first-stage candidates first, and keeps the best k. A
+        batch is skipped once the time spent plus the last batch's duration would exceed the budget;
+        the first batch always runs. Candidates left unscored follow the scored ones in their
+        first-stage order
+
+        Args:
+              query: User question
+              documents: First-stage candidates, best first
+              k: Number of documents to keep
+        Returns:
+              Tuple of ((document, score) pairs, best first, with NaN for unscored ones; and a report
+              with the number of candidates, the number scored and the time taken in ms)
+        """
+        # Loading the model on the first call is not charged to the budget
+        model = self.model
+        start = time.perf_counter()
+        candidates = documents[:self.max_candidates]
+        scores = np.full(len(candidates), np.nan, dtype=np.float32)
+        budget = self.time_budget_ms / 1000
+        scored = 0
+        last_batch = 0.0
+        while scored < len(candidates):
+            if scored and time.perf_counter() - start + last_batch > budget:
+                break
+            batch_start = time.perf_counter()
+            batch = candidates[scored:scored + self.batch_size]
+            scores[scored:scored + len(batch)] = model.predict(
+                [(query, doc.page_content) for doc in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            ).reshape(-1)
+            scored += len(batch)
+            last_batch = time.perf_counter() - batch_start
+
+        order = np.concatenate([np.argsort(-scores[:scored], kind="stable"), np.arange(scored, len(candidates))])[:k]
+        report = {
+            "candidates": len(candidates),
+            "scored": scored,
+            "ms": (time.perf_counter() - start) * 1000,
+        }
+        return [(candidates[i], float(scores[i])) for i in order], report
@@ -0,0 +1,261 @@
+from typing import List, Dict, Optional, Tuple
+from collections import defaultdict, deque
+from bisect import bisect_left
+import re
+
+
+SECTION_PATTERNS = {
+    "abstract": ["abstract","abstract:","abstract."],
+    "introduction": ["introduction",r"introduction[a-z\:\-]?"],
+    "related_work": ["related work", "background"],
+    "methodology": ["methodology", "methods", "approach"],
+    "conclusion": ["conclusions", "future work","conclusion"],
+    "references": ["references", "bibliography"]
+}
+
+TITLE_SECTION = "Paper title and author info"
+
+# "." is left out on purpose so literal headings such as "abstract." stay literal
+_REGEX_CHARS = re.compile(r"[\[\]\(\)\{\}\*\+\?\|\\\^\$]")
+
+
+class _Word:
+    """
+    One word of a heading pattern, matched either literally or as a full-token regex
+    """
+
+    def __init__(self, word: str):
+        """
+        Compiles the word when it contains regex syntax
+
+        Args:
+              word: Word of a heading pattern
+        Returns:
+              None
+        """
+        self.literal = None if _REGEX_CHARS.search(word) else word
+        self.regex = re.compile(word) if self.literal is None else None
+        self.source = re.escape(word) if self.literal is not None else f"(?:{word})"
+
+        # Literal text every match must start with, used to jump between candidates
+        self.prefix = word
+        if self.literal is None:
+            self.prefix = re.match(r"[\w\-]*", word).group()
+            if word[len(self.prefix):len(self.prefix) + 1] in ("?", "*", "{"):
+                self.prefix = self.prefix[:-1]
+
+    def matches(self, token: str) -> bool:
+        """
+        Checks a single token against the word
+
+        Args:
+              token: Normalized document token
+        Returns:
+              True if the token matches
+        """
+        if self.literal is not None:
+            return token == self.literal
+        return self.regex.fullmatch(token) is not None
+
+
+class _Heading:
+    """
+    A compiled heading pattern with its section rank
+    """
+
+    def __init__(self, pattern: str, rank: int):
+        """
+        Splits the pattern into words and compiles each of them
+
+        Args:
+              pattern: Heading pattern, possibly multi-word and possibly regex
+              rank: Position of the pattern's section in SECTION_PATTERNS
+        Returns:
+              None
+        """
+        self.pattern = pattern
+        self.rank = rank
+        self.words = [_Word(word) for word in pattern.split()]
+        # Matches whole tokens of the space-framed normalized text, starting at the space before
+        # the first word; runs of spaces are empty tokens
+        self.scanner = re.compile(
+            r" " + r" +".join(word.source for word in self.words) + r"(?= )"
+        )
+
+    def matches(self, tokens: List[str]) -> bool:
+        """
+        Checks a window of consecutive non-empty tokens against the heading
+
+        Args:
+              tokens: Tokens, exactly as many as the heading has words
+        Returns:
+              True if every word matches its token
+        """
+        return all(word.matches(token) for word, token in zip(self.words, tokens))
+
+
+class SectionDetector:
+    """
+    One-pass heading detection over a token stream, supporting multi-word and regex headings
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]] = None):
+        """
+        Compiles the heading patterns and indexes them by last word for streaming
+
+        Args:
+              patterns: Mapping of section name to heading patterns, in document order (optional)
+        Returns:
+              None
+        """
+        self.patterns = patterns or SECTION_PATTERNS
+        self.headings = [
+            _Heading(pattern, rank)
+            for rank, section_patterns in enumerate(self.patterns.values())
+            for pattern in section_patterns
+        ]
+        self.max_words = max(len(heading.words) for heading in self.headings)
+
+        # Headings grouped under the shortest literal prefix that covers them, so each
+        # distinct prefix is searched for once
+        self._by_needle = defaultdict(list)
+        self._unanchored = []
+        needles = []
+        for heading in sorted(self.headings, key=lambda h: len(h.words[0].prefix)):
+            prefix = heading.words[0].prefix
+            if not prefix:
+                self._unanchored.append(heading)
+                continue
+            needle = next((n for n in needles if prefix.startswith(n)), None)
+            if needle is None:
+                needle = prefix
+                needles.append(needle)
+            self._by_needle[needle].append(heading)
+
+        self._by_last = defaultdict(list)
+        self._regex_last = []
+        for heading in self.headings:
+            last = heading.words[-1]
+            if last.literal is not None:
+                self._by_last[last.literal].append(heading)
+            else:
+                self._regex_last.append(heading)
+
+    def occurrences(self, text_list: List[str], text: str = None) -> Dict[str, List[int]]:
+        """
+        Finds every position of every heading in one linear scan per distinct heading prefix;
+        empty tokens are skipped between the words of multi-word headings
+
+        Args:
+              text_list: List of string tokens representing the document text
+              text: The normalized text the tokens were split from on " " (optional, saves a join)
+        Returns:
+              Dictionary mapping each pattern to its sorted starting indices
+        """
+        text = " " + (" ".join(text_list) if text is None else text) + " "
+        offsets = defaultdict(list)
+
+        for heading in self._unanchored:
+            offsets[heading.pattern] = [match.start() for match in heading.scanner.finditer(text)]
+
+        for needle, headings in self._by_needle.items():
+            # str.find skips to candidate headings far faster than the regex engine can
+            needle = " " + needle
+            pos = text.find(needle)
+            while pos != -1:
+                for heading in headings:
+                    if heading.scanner.match(text, pos):
+                        offsets[heading.pattern].append(pos)
+                pos = text.find(needle, pos + 1)
+
+        # Tokens never contain spaces, so the spaces before an offset give its token index
+        token_index = {}
+        spaces = last = 0
+        for offset in sorted({o for hits in offsets.values() for o in hits}):
+            spaces += text.count(" ", last, offset)
+            token_index[offset] = spaces
+            last = offset
+
+        return {pattern: [token_index[o] for o in hits] for pattern, hits in offsets.items()}
+
+    def detect(self, text_list: List[str], text: str = None) -> Dict[str, int]:
+        """
+        Resolves section start indices: for each section in order, the first of its patterns
+        that occurs at or after the previous section start wins
+
+        Args:
+              text_list: List of string tokens representing the document text
+              text: The normalized text the tokens were split from on " " (optional, saves a join)
+        Returns:
+              Dictionary mapping section names to their starting indices
+        """
+        found = self.occurrences(text_list, text)
+        curr_pos = 0
+        page_dict = {TITLE_SECTION: 0}
+
+        for section_patterns in self.patterns.values():
+            for pattern in section_patterns:
+                hits = found.get(pattern, [])
+                idx = bisect_left(hits, curr_pos)
+                if idx < len(hits) and pattern not in page_dict:
+                    page_dict[pattern] = hits[idx]
+                    curr_pos = hits[idx]
+                    break
+        return page_dict
+
+    def matcher(self) -> "StreamingMatcher":
+        """
+        Creates a stateful matcher for token-at-a-time detection
+
+        Args:
+              No arguments
+        Returns:
+              StreamingMatcher bound to this detector
+        """
+        return StreamingMatcher(self)
+
+
+class StreamingMatcher:
+    """
+    Reports headings as their last word arrives, keeping only a window of the most recent tokens
+    """
+
+    def __init__(self, detector: SectionDetector):
+        """
+        Initializes the token window
+
+        Args:
+              detector: SectionDetector providing compiled headings
+        Returns:
+              None
+        """
+        self.detector = detector
+        self._window = deque(maxlen=detector.max_words)
+        self._position = 0
+
+    def feed(self, token: str, after_rank: int = -1) -> Optional[Tuple[str, int, int]]:
+        """
+        Consumes the next token and reports a heading of a later section ending at it
+
+        Args:
+              token: Normalized document token
+              after_rank: Rank of the currently open section; only later sections are reported
+        Returns:
+              Tuple of (pattern, section rank, start index) for the earliest-ranked match, or None
+        """
+        position = self._position
+        self._position += 1
+        if not token:
+            return None
+
+        self._window.append((position, token))
+        recent = list(self._window)
+        best = None
+        for heading in self.detector._by_last.get(token, []) + self.detector._regex_last:
+            width = len(heading.words)
+            if heading.rank <= after_rank or width > len(recent):
+                continue
+            window = recent[-width:]
+            if heading.matches([t for _, t in window]) and (best is None or heading.rank < best[1]):
+                best = (heading.pattern, heading.rank, window[0][0])
+        return best
@@ -0,0 +1,610 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, Union
+from collections import defaultdict
+from pathlib import Path
+import threading
+import hashlib
+import shutil
+import heapq
+import uuid
+import re
+import os
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from config.settings import settings
+from core.embedding import EmbeddingManager
+from core.index_versions import index_exists
+from core.vector_store import ManagerRetriever, VectorStoreManager
+
+
+SHARD_KEYS = ("venue", "year", "paper_id")
+UNKNOWN_SHARD = "unknown"
+
+T = TypeVar("T")
+
+
+def shard_layout() -> Optional[str]:
+    """
+    Describes the configured partitioning, e.g. "year/5" or "paper_id/8"
+
+    Args:
+          No arguments
+    Returns:
+          Layout string, or None when the store is not sharded
+    """
+    key = settings.SHARD_KEY
+    if not key:
+        return None
+    if key == "year":
+        return f"year/{settings.SHARD_YEAR_BUCKET}"
+    if key == "paper_id":
+        return f"paper_id/{settings.SHARD_COUNT}"
+    return key
+
+
+def shard_name(metadata: Dict, key: str = None) -> str:
+    """
+    Names the shard a chunk belongs to: its venue, its year bucket (e.g. "2015-2019") or a stable
+    hash bucket of its paper_id (e.g. "shard-03")
+
+    Args:
+          metadata: Chunk metadata
+          key: One of SHARD_KEYS (default from settings)
+    Returns:
+          Shard name, usable as a directory name
+    """
+    key = key or settings.SHARD_KEY
+    if key not in SHARD_KEYS:
+        raise ValueError(f"Unsupported shard key: {key}")
+
+    value = metadata.get(key)
+    if key == "paper_id" and not value:
+        # Papers without an identifier still land together
+        value = metadata.get("title")
+    if value is None or value == "":
+        return UNKNOWN_SHARD
+
+    if key == "year":
+        try:
+            start = int(value) // settings.SHARD_YEAR_BUCKET * settings.SHARD_YEAR_BUCKET
+        except (TypeError, ValueError):
+            return UNKNOWN_SHARD
+        return f"{start}-{start + settings.SHARD_YEAR_BUCKET - 1}" if settings.SHARD_YEAR_BUCKET > 1 else str(start)
+    if key == "paper_id":
+        digest = hashlib.sha1(str(value).encode("utf-8")).digest()
+        return f"shard-{int.from_bytes(digest[:8], 'big') % settings.SHARD_COUNT:02d}"
+    return re.sub(r"[^a-z0-9._-]+", "_", str(value).lower()).strip("._") or UNKNOWN_SHARD
+
+
+class ShardedVectorStore:
+    """
+    Several VectorStoreManagers, one per shard of the library, searched in parallel and merged by
+    score; each shard is saved to, loaded from and rebuilt in its own directory under the index path
+    """
+
+    def __init__(self, embedding_manager: EmbeddingManager = None, key: str = None):
+        """
+        Initializes an empty sharded store
+
+        Args:
+              embedding_manager: An embedding manager instance shared by every shard (optional)
+              key: Partition key, one of SHARD_KEYS (default from settings)
+        Returns:
+              None
+        """
+        self.embedding_manager = embedding_manager or EmbeddingManager()
+        self.key = key or settings.SHARD_KEY
+        if self.key not in SHARD_KEYS:
+            raise ValueError(f"Unsupported shard key: {self.key}")
+        self.index_path = Path(settings._FAISS_INDEX_PATH)
+        self.shards: Dict[str, VectorStoreManager] = {}
+        # Index root the shards were loaded from, followed by reload_if_changed
+        self._loaded_root: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def is_initialized(self) -> bool:
+        """
+        Checks if any shard holds an index
+
+        Args:
+              No arguments
+        Returns:
+              True if at least one shard is initialized
+        """
+        return any(shard.is_initialized() for shard in self.shards.values())
+
+    def _shard(self, name: str) -> VectorStoreManager:
+        """
+        Gets a shard by name, creating an empty one if needed
+
+        Args:
+              name: Shard name
+        Returns:
+              VectorStoreManager of the shard
+        """
+        with self._lock:
+            shard = self.shards.get(name)
+            if shard is None:
+                shard = VectorStoreManager(self.embedding_manager)
+                shard.index_path = self.index_path / name
+                # Copy on write, so concurrent searches iterate a stable dictionary
+                self.shards = {**self.shards, name: shard}
+            return shard
+
+    def _fan_out(self, shards: List[VectorStoreManager], task: Callable[[VectorStoreManager], T]) -> List[T]:
+        """
+        Runs a task on every shard in parallel; FAISS releases the GIL while it searches
+
+        Args:
+              shards: Shards to run on
+              task: Function called with each shard
+        Returns:
+              Results in shard order
+        """
+        if len(shards) <= 1:
+            return [task(shard) for shard in shards]
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    workers = settings.SHARD_SEARCH_THREADS or min(32, os.cpu_count() or 1)
+                    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-search")
+        return list(self._pool.map(task, shards))
+
+    def _routed(self, metadata_filter: Optional[dict]) -> List[VectorStoreManager]:
+        """
+        Picks the initialized shards a search has to visit; a filter on the shard key skips the rest
+
+        Args:
+              metadata_filter: Optional metadata filter
+        Returns:
+              List of shards
+        """
+        names = None
+        value = (metadata_filter or {}).get(self.key)
+        if value is not None and not isinstance(value, dict):
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            names = {shard_name({self.key: item}, self.key) for item in values}
+        return [
+            shard for name, shard in self.shards.items()
+            if shard.is_initialized() and (names is None or name in names)
+        ]
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> None:
+        """
+        Adds documents to the shards their metadata routes them to
+
+        Args:
+              documents: List of document objects to add
+              ids: Optional docstore ids, one per document
+        Returns:
+              None
+        """
+        groups: Dict[str, Tuple[List[Document], List[Optional[str]]]] = defaultdict(lambda: ([], []))
+        for i, doc in enumerate(documents):
+            group = groups[shard_name(doc.metadata, self.key)]
+            group[0].append(doc)
+            group[1].append(ids[i] if ids is not None else None)
+        for name, (docs, doc_ids) in groups.items():
+            self._shard(name).add_documents(docs, ids=doc_ids if ids is not None else None)
+
+    def create_from_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> None:
+        """
+        Replaces every shard with new ones built from documents
+
+        Args:
+              documents: List of document objects to index
+              ids: Optional docstore ids, one per document
+        Returns:
+              None
+        """
+        self.clear()
+        self.add_documents(documents, ids=ids)
+
+    def mark_deleted(self, ids: Iterable[str]) -> int:
+        """
+        Tombstones documents by docstore id in whichever shards hold them
+
+        Args:
+              ids: Docstore ids
+        Returns:
+              Number of documents newly marked deleted
+        """
+        ids = list(ids)
+        return sum(self._fan_out(self._routed(None), lambda shard: shard.mark_deleted(ids)))
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Removes documents by docstore id from whichever shards hold them
+
+        Args:
+              ids: Docstore ids
+        Returns:
+              Number of documents removed
+        """
+        return sum(self._fan_out(self._routed(None), lambda shard: shard.delete(ids)))
+
+    def delete_paper(self, paper_id: str) -> int:
+        """
+        Tombstones every chunk of a paper; every shard is checked since a corrected paper may have moved
+
+        Args:
+              paper_id: paper_id metadata value of the paper's chunks
+        Returns:
+              Number of chunks marked deleted
+        """
+        return sum(self._fan_out(self._routed(None), lambda shard: shard.delete_paper(paper_id)))
+
+    def replace_paper(self, paper_id: str, documents: List[Document], ids: Optional[List[str]] = None) -> int:
+        """
+        Replaces a paper's chunks, embedding only the new ones
+
+        Args:
+              paper_id: paper_id metadata value of the chunks to replace
+              documents: The paper's new chunk documents
+              ids: Optional docstore ids for the new chunks
+        Returns:
+              Number of old chunks marked deleted
+        """
+        removed = self.delete_paper(paper_id)
+        if documents:
+            self.add_documents(documents, ids=ids or [str(uuid.uuid4()) for _ in documents])
+        return removed
+
+    def wait_for_compaction(self) -> None:
+        """
+        Blocks until every shard's background compaction has finished
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        for shard in list(self.shards.values()):
+            shard.wait_for_compaction()
+
+    def build_index(self, kind: str = None, shards: Optional[List[str]] = None, storage: str = None) -> None:
+        """
+        Rebuilds shards as the configured ANN index type and vector precision
+
+        Args:
+              kind: Index type (default from settings)
+              shards: Names of the shards to rebuild (default all)
+              storage: Vector precision (default from settings)
+        Returns:
+              None
+        """
+        for name in shards or list(self.shards):
+            shard = self.shards[name]
+            if shard.is_initialized():
+                shard.build_index(kind, storage=storage)
+
+    def build_keyword_index(self, shards: Optional[List[str]] = None) -> None:
+        """
+        Builds each shard's BM25 index over its chunk text
+
+        Args:
+              shards: Names of the shards to index (default all)
+        Returns:
+              None
+        """
+        for name in shards or list(self.shards):
+            shard = self.shards[name]
+            if shard.is_initialized():
+                shard.build_keyword_index()
+
+    def keyword_search(
+            self,
+            query: str,
+            k: int = None,
+            metadata_filter: Optional[dict] = None,
+            score_threshold: Optional[float] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        BM25 search across shards, merged by score; term statistics are per shard, so scores from
+        different shards are close to, not exactly, what one index would give
+
+        Args:
+              query: Search query
+              k: Number of top results to retrieve
+              metadata_filter: Optional metadata filter
+              score_threshold: Drop hits whose cosine similarity to the embedded query is below this (optional)
+        Returns:
+              List of (document, BM25 score) pairs, best first
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        k = k or settings.TOP_K_RESULTS
+        results = self._fan_out(
+            self._routed(metadata_filter), lambda shard: shard.keyword_search(query, k, metadata_filter, score_threshold)
+        )
+        return heapq.nlargest(k, (hit for hits in results for hit in hits), key=lambda hit: hit[1])
+
+    def search(self, query: str, k: int = None, metadata_filter: Optional[dict] = None) -> List[Document]:
+        """
+        Searches every relevant shard in parallel and keeps the overall top-k
+
+        Args:
+              query: Search query
+              k: Number of top results to retrieve
+              metadata_filter: Optional metadata filter (e.g. {"title": "paper name"})
+        Returns:
+              List of document objects
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        k = k or settings.TOP_K_RESULTS
+        vector = self.embedding_manager.embedding.embed_query(query)
+        results = self._fan_out(
+            self._routed(metadata_filter), lambda shard: shard._search_by_vector(vector, k, metadata_filter)
+        )
+        return [doc for doc, _ in heapq.nsmallest(k, (hit for hits in results for hit in hits), key=lambda hit: hit[1])]
+
+    def search_with_scores(
+            self,
+            query: str,
+            k: int = None,
+            metadata_filter: Optional[dict] = None,
+            score_threshold: Optional[float] = None,
+            mmr: bool = False,
+            fetch_k: int = None,
+            lambda_mult: float = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Scored search across shards, merged by cosine similarity; MMR re-selects within each shard
+
+        Args:
+              query: Search query
+              k: Maximum number of results to return
+              metadata_filter: Optional metadata filter
+              score_threshold: Drop hits whose similarity is below this (optional)
+              mmr: Re-select the hits with maximal marginal relevance
+              fetch_k: Number of nearest candidates MMR chooses from (default from settings)
+              lambda_mult: MMR trade-off (default from settings)
+        Returns:
+              List of (document, cosine similarity) pairs, best first
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        k = k or settings.TOP_K_RESULTS
+        fetch_k = max(fetch_k or settings.RETRIEVAL_FETCH_K, k) if mmr else k
+        lambda_mult = settings.RETRIEVAL_MMR_LAMBDA if lambda_mult is None else lambda_mult
+        vector = self.embedding_manager.embedding.embed_query(query)
+        results = self._fan_out(
+            self._routed(metadata_filter),
+            lambda shard: shard._scored_by_vector(vector, k, metadata_filter, score_threshold, mmr, fetch_k, lambda_mult)
+        )
+        return heapq.nlargest(k, (hit for hits in results for hit in hits), key=lambda hit: hit[1])
+
+    def search_many(
+            self,
+            queries: List[str],
+            k: int = None,
+            metadata_filter: Optional[dict] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Searches many queries at once: embedded in one batch, each shard searches them as one matrix
+
+        Args:
+              queries: Search queries
+              k: Number of top results to retrieve per query
+              metadata_filter: Optional metadata filter applied to every query
+        Returns:
+              One list of (document, squared L2 distance) pairs per query, closest first
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        if not queries:
+            return []
+        k = k or settings.TOP_K_RESULTS
+        vectors = self.embedding_manager.embed_queries(queries)
+        results = self._fan_out(
+            self._routed(metadata_filter), lambda shard: shard._search_by_vectors(vectors, k, metadata_filter)
+        )
+        return [
+            heapq.nsmallest(k, (hit for shard_hits in results for hit in shard_hits[i]), key=lambda hit: hit[1])
+            for i in range(len(queries))
+        ]
+
+    def get_retriever(self, k: int = None, metadata_filter: dict | None = None) -> BaseRetriever:
+        """
+        Gets a LangChain retriever searching every shard
+
+        Args:
+              k: Number of top results to retrieve
+              metadata_filter: Optional metadata filter
+        Returns:
+              Retriever object compatible with LangChain
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        return ManagerRetriever(manager=self, k=k or settings.TOP_K_RESULTS, metadata_filter=metadata_filter or None)
+
+    def shard_path(self, name: str, path: Union[str, Path] = None) -> Path:
+        """
+        Directory a shard is persisted in
+
+        Args:
+              name: Shard name
+              path: Index root (default FAISS_INDEX_PATH)
+        Returns:
+              Path of <root>/<shard>
+        """
+        return Path(path or self.index_path) / name
+
+    def exists(self, path: str = None) -> bool:
+        """
+        Checks whether any shard has been saved
+
+        Args:
+              path: Index root (default FAISS_INDEX_PATH)
+        Returns:
+              True if at least one shard directory holds an index
+        """
+        return bool(self.saved_shards(path))
+
+    def saved_shards(self, path: str = None) -> List[str]:
+        """
+        Lists the shards saved under the index root
+
+        Args:
+              path: Index root (default FAISS_INDEX_PATH)
+        Returns:
+              Sorted shard names
+        """
+        root = Path(path or self.index_path)
+        if not root.is_dir():
+            return []
+        return sorted(child.name for child in root.iterdir() if child.is_dir() and index_exists(child))
+
+    def save(self, path: str = None, shards: Optional[List[str]] = None) -> None:
+        """
+        Saves shards to their own directories under the index root. Saving every shard makes this
+        store the whole index, so shard directories it does not hold (left by an earlier layout or
+        a venue that is gone) are retired once the others are written
+
+        Args:
+              path: Index root (default FAISS_INDEX_PATH)
+              shards: Names of the shards to save (default all)
+        Returns:
+              None
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        for name in shards or list(self.shards):
+            shard = self.shards[name]
+            if shard.is_initialized():
+                shard.save(self.shard_path(name, path))
+        if shards is None:
+            self.retire_shards(path)
+
+    def retire_shards(self, path: str = None) -> List[str]:
+        """
+        Deletes saved shard directories this store does not hold; readers drop them on their next
+        reload and keep their open files until then
+
+        Args:
+              path: Index root (default FAISS_INDEX_PATH)
+        Returns:
+              Names of the retired shards
+        """
+        live = {name for name, shard in self.shards.items() if shard.is_initialized()}
+        retired = [name for name in self.saved_shards(path) if name not in live]
+        for name in retired:
+            shutil.rmtree(self.shard_path(name, path), ignore_errors=True)
+        if retired:
+            print(f"Retired {len(retired)} shards not in the current layout: {', '.join(retired)}")
+        return retired
+
+    def load_shard(self, name: str, path: str = None, mmap: bool = None) -> VectorStoreManager:
+        """
+        Loads (or reloads) a single shard from disk
+
+        Args:
+              name: Shard name
+              path: Index root (default FAISS_INDEX_PATH)
+              mmap: Map index.faiss read-only (default from settings)
+        Returns:
+              VectorStoreManager of the shard
+        """
+        shard = self._shard(name)
+        shard.load(self.shard_path(name, path), mmap=mmap)
+        return shard
+
+    def load(self, path: str = None, mmap: bool = None) -> Dict[str, VectorStoreManager]:
+        """
+        Loads every shard saved under the index root
+
+        Args:
+              path: Index root (default FAISS_INDEX_PATH)
+              mmap: Map index.faiss read-only (default from settings)
+        Returns:
+              Dictionary of shard name to VectorStoreManager
+        """
+        names = self.saved_shards(path)
+        if not names:
+            raise ValueError(f"No shards found under {Path(path or self.index_path)}")
+        self.clear()
+        for name in names:
+            self.load_shard(name, path, mmap)
+        self._loaded_root = Path(path or self.index_path)
+        return self.shards
+
+    def reload_if_changed(self, mmap: bool = None) -> bool:
+        """
+        Swaps in newly published versions of each shard, loads shards that appeared since and drops
+        shards that were retired; each shard keeps serving its loaded version until the new one is ready
+
+        Args:
+              mmap: Map index.faiss read-only (default from settings)
+        Returns:
+              True if any shard changed
+        """
+        changed = False
+        root = self._loaded_root or self.index_path
+        saved = self.saved_shards(root)
+        for name in saved:
+            shard = self.shards.get(name)
+            if shard is not None and shard.is_initialized():
+                changed = shard.reload_if_changed(mmap=mmap) or changed
+                continue
+            fresh = VectorStoreManager(self.embedding_manager)
+            fresh.index_path = self.shard_path(name, root)
+            fresh.load(fresh.index_path, mmap=mmap)
+            with self._lock:
+                self.shards = {**self.shards, name: fresh}
+            print(f"Vector store shard {name} loaded")
+            changed = True
+
+        # Drop retired shards only after their replacements are in, so searches never see a gap
+        retired = [name for name in self.shards if name not in saved]
+        if retired:
+            with self._lock:
+                self.shards = {name: shard for name, shard in self.shards.items() if name not in retired}
+            print(f"Vector store shards dropped: {', '.join(retired)}")
+            changed = True
+        return changed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counts the vectors held by each shard
+
+        Args:
+              No arguments
+        Returns:
+              Dictionary of shard name to number of vectors
+        """
+        return {
+            name: shard.vector_store.index.ntotal if shard.is_initialized() else 0
+            for name, shard in sorted(self.shards.items())
+        }
+
+    def clear(self) -> None:
+        """
+        Drops every shard from memory
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        with self._lock:
+            shards, self.shards = self.shards, {}
+        for shard in shards.values():
+            shard.clear()
+
+
+def create_vector_store(embedding_manager: EmbeddingManager = None) -> Union[VectorStoreManager, ShardedVectorStore]:
+    """
+    Builds the store the settings ask for: sharded when SHARD_KEY is set, a single index otherwise
+
+    Args:
+          embedding_manager: An embedding manager instance (optional)
+    Returns:
+          VectorStoreManager or ShardedVectorStore
+    """
+    if settings.SHARD_KEY:
+        return ShardedVectorStore(embedding_manager)
+    return VectorStoreManager(embedding_manager)
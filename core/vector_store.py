@@ -1,12 +1,100 @@
 from core.embedding import EmbeddingManager
+from core.docstore import SQLiteDocstore, SQLiteIdMap, DOCSTORE_FILE
+from core.attribute_index import AttributeIndex
+from core.bm25_index import BM25Index, BM25_FILE
+from core.index_versions import current_version, index_exists, new_version, publish, prune, version_path
+from core.index_factory import (
+    build_index, apply_search_params, reconstruct_all, reconstruct_positions, remove_positions,
+    search_parameters, index_type, index_storage, is_lossy
+)
 from langchain_community.vectorstores import FAISS
-from typing import List,Optional
+from typing import Any,Dict,Iterable,List,Optional,Tuple
 from config.settings import settings
 from pathlib import Path
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
+import numpy as np
+import threading
+import pickle
+import faiss
+import uuid
 import os
 
+
+VECTORS_FILE="vectors.npy"
+
+
+def maximal_marginal_relevance(query:np.ndarray,candidates:np.ndarray,k:int,lambda_mult:float=0.5)->np.ndarray:
+    """
+    Picks k candidates balancing similarity to the query against similarity to those already
+    picked; every step scores all remaining candidates at once
+
+    Args:
+          query: unit query vector
+          candidates: unit candidate vectors, one per row
+          k: number of candidates to pick
+          lambda_mult: 1 ranks by relevance only, 0 by diversity only
+    Returns:
+          int array of picked row indexes, in pick order
+    """
+    count=len(candidates)
+    k=min(k,count)
+    if k<=0:
+        return np.empty(0,dtype=np.int64)
+    relevance=candidates@query
+    pairwise=candidates@candidates.T
+    picked=[int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything picked so far
+    redundancy=pairwise[picked[0]].copy()
+    available=np.ones(count,dtype=bool)
+    available[picked[0]]=False
+    for _ in range(k-1):
+        scores=lambda_mult*relevance-(1-lambda_mult)*redundancy
+        scores[~available]=-np.inf
+        best=int(np.argmax(scores))
+        picked.append(best)
+        available[best]=False
+        np.maximum(redundancy,pairwise[best],out=redundancy)
+    return np.array(picked,dtype=np.int64)
+
+
+def _unit(vectors:np.ndarray)->np.ndarray:
+    """
+    Scale vectors to unit length, leaving zero vectors as they are
+
+    Args:
+          vectors: float array of shape (n, dimension) or (dimension,)
+    Returns:
+          float32 array of the same shape
+    """
+    vectors=np.asarray(vectors,dtype=np.float32)
+    norms=np.linalg.norm(vectors,axis=-1,keepdims=True)
+    return vectors/np.where(norms==0,1,norms)
+
+
+class ManagerRetriever(BaseRetriever):
+    """
+    LangChain retriever answering through VectorStoreManager.search, so filtered retrieval uses
+    the attribute index
+    """
+    manager: Any
+    k: int
+    metadata_filter: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        """
+        Retrieves the top-k documents for a query
+
+        Args:
+              query: search query
+              run_manager: LangChain callback manager
+        Returns:
+              List of document objects
+        """
+        return self.manager.search(query, k=self.k, metadata_filter=self.metadata_filter)
+
+
 class VectorStoreManager:
     """
     Manages a FAISS vector store for document embeddings
@@ -26,6 +114,25 @@ class VectorStoreManager:
         self._vector_store:Optional[FAISS]=None
         # self.index_path=settings.FAST_INDEX_PATH 
         self.index_path=Path(settings._FAISS_INDEX_PATH)
+        # Set while the index is a read-only memory map of this file
+        self._mmap_path:Optional[Path]=None
+        # Built on the first filtered search, dropped whenever positions change
+        self._attributes:Optional[AttributeIndex]=None
+        # Ids marked deleted; their vectors stay in the index until the next compaction
+        self._tombstones:set=set()
+        self._dead:Optional[np.ndarray]=None
+        # Exact float32 vectors in position order, kept while the index only stores approximations
+        self._exact:Optional[np.ndarray]=None
+        # BM25 index over chunk text, and the current position of each of its rows (-1 once deleted)
+        self._keywords:Optional[BM25Index]=None
+        self._keyword_positions:Optional[np.ndarray]=None
+        # Guards the index, id map and tombstones; the generation changes whenever positions are renumbered
+        self._lock=threading.RLock()
+        self._generation=0
+        self._compaction:Optional[threading.Thread]=None
+        # Published version currently served, and the index directory it came from
+        self.version:Optional[str]=None
+        self._loaded_root:Optional[Path]=None
 
     @property
     def vector_store(self)->Optional[FAISS]:
@@ -51,81 +158,959 @@ class VectorStoreManager:
         """
         return self._vector_store is not None
     
-    def create_from_documents(self,documents:List[Document]):
+    def create_from_documents(self,documents:List[Document],ids:Optional[List[str]]=None):
         """
         Create a new vector store from documents
 
         Args:
               documents: list of document object to index
+              ids: optional docstore ids, one per document
         Returns:
               None
         """
-        self._vector_store=FAISS.from_documents(
+        store=FAISS.from_documents(
             documents=documents,
-            embedding=self.embedding_manager.embedding
+            embedding=self.embedding_manager.embedding,
+            ids=ids
         )
-        
-    def add_documents(self,documents:List[Document])->None:
+        with self._lock:
+            self._vector_store=store
+            self._reset_state()
+
+    def add_documents(self,documents:List[Document],ids:Optional[List[str]]=None)->None:
         """
         Storing vector store to disk or adding to existing index
 
         Args:
               documents: list of document object to add to the index
+              ids: optional docstore ids, one per document
         Returns:
               None
         """
         if not self.is_initialized():
-            self.create_from_documents(documents)
-        else:
-            self._vector_store.add_documents(documents)
+            self.create_from_documents(documents,ids=ids)
+            return
+        if ids is None and any(doc.id for doc in documents):
+            ids=[doc.id or str(uuid.uuid4()) for doc in documents]
+        if ids is not None and self._tombstones.intersection(ids):
+            # The tombstoned rows still own these ids until they are compacted away
+            with self._lock:
+                self._ensure_writable()
+            self.compact()
+
+        # Embed before taking the lock so searches are not held up by the model
+        texts=[doc.page_content for doc in documents]
+        vectors=self.embedding_manager.embedding.embed_documents(texts)
+        with self._lock:
+            self._ensure_writable()
+            self._vector_store.add_embeddings(zip(texts,vectors),metadatas=[doc.metadata for doc in documents],ids=ids)
+            if self._exact is not None:
+                self._exact=np.vstack([self._exact,np.asarray(vectors,dtype=np.float32)])
+            self._attributes=None
+
+    def delete(self,ids:List[str])->int:
+        """
+        Remove documents from the index by docstore id, ignoring ids that are not present
+
+        Args:
+              ids: docstore ids of the documents to remove
+        Returns:
+              Number of documents removed
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        with self._lock:
+            store=self._vector_store
+            targets=set(ids)
+            removed=[(position,_id) for position,_id in store.index_to_docstore_id.items() if _id in targets]
+            if not removed:
+                return 0
+
+            self._ensure_writable()
+            positions={position for position,_ in removed}
+            store.index=remove_positions(store.index,positions,self._exact)
+            if self._exact is not None:
+                self._exact=np.delete(self._exact,sorted(positions),axis=0)
+            store.docstore.delete([_id for _,_id in removed])
+            # Later vectors moved down, so renumber the ids the same way
+            remaining=[_id for position,_id in sorted(store.index_to_docstore_id.items()) if position not in positions]
+            store.index_to_docstore_id={i:_id for i,_id in enumerate(remaining)}
+            self._tombstones.difference_update(_id for _,_id in removed)
+            self._renumbered()
+            return len(removed)
+
+    def mark_deleted(self,ids:Iterable[str])->int:
+        """
+        Tombstone documents by docstore id: searches skip them at once, and their vectors are dropped
+        by a background compaction once COMPACTION_THRESHOLD of the index is tombstoned
+
+        Args:
+              ids: docstore ids of the documents to remove; unknown ids are ignored
+        Returns:
+              Number of documents newly marked deleted
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        with self._lock:
+            present=set(self._vector_store.index_to_docstore_id.values())
+            marked=(set(ids)&present)-self._tombstones
+            self._tombstones.update(marked)
+            self._dead=None
+            self._keyword_positions=None
+        if marked:
+            self._maybe_compact()
+        return len(marked)
+
+    def delete_paper(self,paper_id:str)->int:
+        """
+        Tombstone every chunk of a paper
+
+        Args:
+              paper_id: paper_id metadata value of the paper's chunks
+        Returns:
+              Number of chunks marked deleted
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        with self._lock:
+            positions=self.attribute_index.select({"paper_id":paper_id})
+            id_map=self._vector_store.index_to_docstore_id
+            ids=[id_map[int(position)] for position in positions]
+        return self.mark_deleted(ids)
+
+    def replace_paper(self,paper_id:str,documents:List[Document],ids:Optional[List[str]]=None)->int:
+        """
+        Replace a paper's chunks with new ones, embedding only the new chunks
+
+        Args:
+              paper_id: paper_id metadata value of the chunks to replace
+              documents: the paper's new chunk documents
+              ids: optional docstore ids for the new chunks (fresh ids by default)
+        Returns:
+              Number of old chunks marked deleted
+        """
+        removed=self.delete_paper(paper_id)
+        if documents:
+            self.add_documents(documents,ids=ids or [str(uuid.uuid4()) for _ in documents])
+        return removed
+
+    @property
+    def deleted_fraction(self)->float:
+        """
+        Get the share of stored vectors that are tombstoned
+
+        Args:
+              No arguments
+        Returns:
+              Fraction between 0 and 1
+        """
+        if not self.is_initialized() or not self._tombstones:
+            return 0.0
+        return len(self._tombstones)/max(self._vector_store.index.ntotal,1)
+
+    def _maybe_compact(self)->None:
+        """
+        Start a background compaction once enough of the index is tombstoned, unless one is running
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        threshold=settings.COMPACTION_THRESHOLD
+        if threshold<=0 or self.deleted_fraction<threshold:
+            return
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction=threading.Thread(target=self.compact,name="vector-store-compaction",daemon=True)
+            self._compaction.start()
+
+    def wait_for_compaction(self)->None:
+        """
+        Block until a running background compaction has finished
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        compaction=self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def compact(self)->int:
+        """
+        Drop the vectors and documents of tombstoned ids and renumber the rest; the index is rebuilt
+        off to the side, so searches keep running until the result is swapped in
+
+        Args:
+              No arguments
+        Returns:
+              Number of documents dropped (0 if the store changed underneath and the run was abandoned)
+        """
+        with self._lock:
+            if not self.is_initialized() or not self._tombstones:
+                return 0
+            # A clone of a mapped flat index still points into the read-only mapping
+            self._ensure_writable()
+            store=self._vector_store
+            generation=self._generation
+            index=store.index
+            count=index.ntotal
+            items=list(store.index_to_docstore_id.items())
+            dead=self._dead_positions()
+            dropped=[_id for _,_id in items if _id in self._tombstones]
+            exact=self._exact
+
+        print(f"Compacting vector store: dropping {len(dead)} of {count} vectors")
+        # IndexFlat removes in place, so work on a copy while searches still use the original
+        source=faiss.clone_index(index) if index_type(index)=="flat" else index
+        compacted=remove_positions(source,dead,exact)
+        if exact is not None:
+            exact=np.delete(exact,dead,axis=0)
+        dead_set=set(dead.tolist())
+        remaining=[_id for position,_id in sorted(items) if position not in dead_set]
+
+        with self._lock:
+            if generation!=self._generation:
+                print("Vector store was renumbered during compaction, leaving the tombstones for the next run")
+                return 0
+            store=self._vector_store
+            if store.index.ntotal>count:
+                # Documents added meanwhile follow the compacted ones
+                tail=np.arange(count,store.index.ntotal,dtype=np.int64)
+                tail_vectors=self._vectors_at(tail)
+                compacted.add(tail_vectors)
+                if exact is not None:
+                    exact=np.vstack([exact,tail_vectors])
+                remaining.extend(store.index_to_docstore_id[int(position)] for position in tail)
+            store.index=compacted
+            self._exact=exact
+            store.index_to_docstore_id={i:_id for i,_id in enumerate(remaining)}
+            store.docstore.delete(dropped)
+            self._tombstones.difference_update(dropped)
+            self._mmap_path=None
+            self._renumbered()
+        return len(dropped)
+
+    def _dead_positions(self)->np.ndarray:
+        """
+        Get the positions of tombstoned vectors; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              Sorted int64 array of positions
+        """
+        if self._dead is None:
+            tombstones=self._tombstones
+            dead=[position for position,_id in self._vector_store.index_to_docstore_id.items() if _id in tombstones] if tombstones else []
+            self._dead=np.array(sorted(dead),dtype=np.int64)
+        return self._dead
+
+    def _renumbered(self)->None:
+        """
+        Drop everything derived from vector positions after they changed; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        self._dead=None
+        self._attributes=None
+        self._keyword_positions=None
+        self._generation+=1
+
+    def _reset_state(self)->None:
+        """
+        Forget the tombstones and derived state of the previous store; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        self._mmap_path=None
+        self._tombstones=set()
+        self._exact=None
+        self._keywords=None
+        self.version=None
+        self._renumbered()
+
+    def build_index(self,kind:str=None,storage:str=None)->None:
+        """
+        Rebuilds the index as the configured ANN type (flat, ivf_flat, hnsw or ivf_pq) and vector
+        precision (float32, float16 or int8), training it on every stored vector; positions and ids
+        stay the same. Lossy indexes keep the exact vectors alongside for re-scoring
+
+        Args:
+              kind: index type (default from settings)
+              storage: vector precision (default from settings)
+        Returns:
+              None
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        kind=kind or settings.FAISS_INDEX_TYPE
+        storage=storage or settings.FAISS_STORAGE
+        with self._lock:
+            store=self._vector_store
+            if index_type(store.index)==kind and (kind=="ivf_pq" or index_storage(store.index)==storage):
+                return
+            print(f"Building {kind} index with {storage} vectors over {store.index.ntotal} vectors")
+            vectors=np.asarray(self._exact if self._exact is not None else reconstruct_all(store.index),dtype=np.float32)
+            store.index=build_index(vectors,kind,storage)
+            self._exact=vectors if is_lossy(store.index) else None
+            size=len(faiss.serialize_index(store.index))
+            print(f"Index takes {size/2**20:.1f} MB ({size/max(vectors.nbytes,1):.0%} of the float32 vectors)")
+            self._mmap_path=None
+            self._generation+=1
+
+    def build_keyword_index(self)->None:
+        """
+        Builds the BM25 index over the text of every live chunk; it is saved with the vector index.
+        Chunks added afterwards are only found by dense search until the next build
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        with self._lock:
+            tombstones=self._tombstones
+            entries=[(_id,text) for _,_id,text in sorted(self._contents_by_position()) if _id not in tombstones]
+            self._keywords=BM25Index.build(entries)
+            self._keyword_positions=None
+        print(
+            f"Built BM25 index over {len(self._keywords)} chunks: {len(self._keywords.terms)} terms, "
+            f"{len(self._keywords.rows)} postings, {self._keywords.nbytes/2**20:.1f} MB"
+        )
+
+    @property
+    def keyword_index(self)->Optional[BM25Index]:
+        """
+        Get the BM25 index over chunk text
+
+        Args:
+              No arguments
+        Returns:
+              BM25Index, or None until build_keyword_index() has run for this index
+        """
+        return self._keywords
+
+    def _contents_by_position(self)->Iterable[Tuple[int,str,str]]:
+        """
+        Read the id and text of every stored vector
+
+        Args:
+              No arguments
+        Returns:
+              Iterable of (position, docstore id, chunk text) triples
+        """
+        store=self._vector_store
+        id_map=store.index_to_docstore_id
+        if isinstance(id_map,SQLiteIdMap) and id_map.docstore is store.docstore:
+            return store.docstore.contents_by_position()
+        return ((position,_id,store.docstore.search(_id).page_content) for position,_id in id_map.items())
+
+    def _keyword_rows(self)->np.ndarray:
+        """
+        Map each BM25 row to the current position of its chunk; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              int64 array with one position per row, -1 for chunks deleted or tombstoned since the build
+        """
+        if self._keyword_positions is None:
+            positions=np.full(len(self._keywords),-1,dtype=np.int64)
+            tombstones=self._tombstones
+            for position,_id in self._vector_store.index_to_docstore_id.items():
+                row=self._keywords.row_of(_id)
+                if row is not None and _id not in tombstones:
+                    positions[row]=position
+            self._keyword_positions=positions
+        return self._keyword_positions
+
+    def _ensure_writable(self)->None:
+        """
+        Replaces a memory-mapped index with an in-memory copy before it is modified, as FAISS aborts
+        the process when a mapped index is resized, and a published docstore with a private working
+        copy, so readers of that version are never locked out by uncommitted writes
+
+        Args:
+              No arguments
+        Returns:
+              None
+        """
+        if self._mmap_path is not None:
+            self._vector_store.index=apply_search_params(faiss.read_index(str(self._mmap_path)))
+            self._mmap_path=None
+        store=self._vector_store
+        if isinstance(store.docstore,SQLiteDocstore) and store.docstore.read_only:
+            root=Path(self._loaded_root or self.index_path)
+            working=store.docstore.working_copy(root/f".{DOCSTORE_FILE}.{uuid.uuid4().hex[:8]}.work")
+            store.docstore.close()
+            store.docstore=working
+            store.index_to_docstore_id=working.id_map()
         
-    def search(self,query:str,k:int=None)->List[Document]:  
+    @property
+    def attribute_index(self)->AttributeIndex:
+        """
+        Get the bitmap index over title, paper_id, year, venue and section, building it if needed
+
+        Args:
+              No arguments
+        Returns:
+              AttributeIndex over the current vector positions
+        """
+        if self._attributes is None:
+            store=self._vector_store
+            self._attributes=AttributeIndex.build(self._metadata_by_position(),store.index.ntotal)
+        return self._attributes
+
+    def _metadata_by_position(self)->Iterable[Tuple[int,Dict]]:
+        """
+        Read the metadata of every stored vector
+
+        Args:
+              No arguments
+        Returns:
+              Iterable of (position, metadata) pairs
+        """
+        store=self._vector_store
+        id_map=store.index_to_docstore_id
+        if isinstance(id_map,SQLiteIdMap) and id_map.docstore is store.docstore:
+            return store.docstore.metadata_by_position()
+        return ((position,store.docstore.search(_id).metadata) for position,_id in id_map.items())
+
+    def _search_by_vector(self,vector:np.ndarray,k:int,metadata_filter:Optional[dict]=None)->List[Tuple[Document,float]]:
+        """
+        Search with an embedded query; a filter on indexed attributes first resolves to candidate
+        positions, so only matching vectors are compared and k hits come back whenever k exist
+
+        Args:
+              vector: query embedding
+              k: number of top results to retrieve
+              metadata_filter: optional metadata filter (e.g. {"title": "paper name"})
+        Returns:
+              List of (document, squared L2 distance) pairs, closest first
+        """
+        return self._search_by_vectors(np.asarray(vector,dtype=np.float32).reshape(1,-1),k,metadata_filter)[0]
+
+    def _search_by_vectors(self,vectors:np.ndarray,k:int,metadata_filter:Optional[dict]=None)->List[List[Tuple[Document,float]]]:
+        """
+        Search with a matrix of embedded queries in one FAISS call (or one matrix product over the
+        filter's candidates)
+
+        Args:
+              vectors: float32 array of shape (queries, dimension)
+              k: number of top results to retrieve per query
+              metadata_filter: optional metadata filter applied to every query
+        Returns:
+              One list of (document, squared L2 distance) pairs per query, closest first
+        """
+        with self._lock:
+            return [self._documents(p,d) for p,d in self._nearest(vectors,k,metadata_filter)]
+
+    def _nearest(self,vectors:np.ndarray,k:int,metadata_filter:Optional[dict]=None)->List[Tuple[np.ndarray,np.ndarray]]:
+        """
+        Find the closest live (not tombstoned) positions for a matrix of embedded queries; caller holds the lock
+
+        Args:
+              vectors: float32 array of shape (queries, dimension)
+              k: number of top results to retrieve per query
+              metadata_filter: optional metadata filter applied to every query
+        Returns:
+              One (positions, squared L2 distances) pair of arrays per query, closest first
+        """
+        store=self._vector_store
+        vectors=np.ascontiguousarray(vectors,dtype=np.float32)
+        fetch=self._fetch_count(k)
+        if not metadata_filter:
+            distances,positions=store.index.search(vectors,fetch,params=self._live_params())
+            return self._rescored(vectors,[self._found(p,d) for p,d in zip(positions,distances)],k)
+
+        candidates=self.attribute_index.select(metadata_filter)
+        if candidates is None:
+            return self._rescored(vectors,self._post_filtered(vectors,fetch,metadata_filter),k)
+        dead=self._dead_positions()
+        if len(dead):
+            candidates=np.setdiff1d(candidates,dead,assume_unique=True)
+        if len(candidates)==0:
+            return [self._found(np.empty(0,dtype=np.int64),np.empty(0,dtype=np.float32)) for _ in vectors]
+        if len(candidates)>settings.FILTER_EXACT_MAX:
+            params=search_parameters(store.index,faiss.IDSelectorBatch(candidates))
+            distances,positions=store.index.search(vectors,fetch,params=params)
+            # Graph search can strand itself among filtered-out nodes; fall back to the exact scan
+            if ((positions!=-1).sum(axis=1)>=min(k,len(candidates))).all():
+                return self._rescored(vectors,[self._found(p,d) for p,d in zip(positions,distances)],k)
+
+        # Compare against exactly the candidate vectors: |q-c|^2 = |q|^2 - 2 q.c + |c|^2
+        stored=self._vectors_at(candidates)
+        distances=(
+            (vectors**2).sum(axis=1,keepdims=True)
+            -2*vectors@stored.T
+            +(stored**2).sum(axis=1)
+        )
+        np.maximum(distances,0,out=distances)
+        top=np.argsort(distances,axis=1,kind="stable")[:,:k]
+        return [(candidates[t],d[t]) for t,d in zip(top,distances)]
+
+    def _fetch_count(self,k:int)->int:
+        """
+        Number of candidates to take from the index: k, or k * FAISS_RESCORE_FACTOR when the index
+        stores approximate vectors and the exact ones are at hand
+
+        Args:
+              k: number of results wanted
+        Returns:
+              Number of candidates to fetch
+        """
+        if self._exact is None or settings.FAISS_RESCORE_FACTOR<=0:
+            return k
+        return k*settings.FAISS_RESCORE_FACTOR
+
+    def _rescored(self,vectors:np.ndarray,results:List[Tuple[np.ndarray,np.ndarray]],k:int)->List[Tuple[np.ndarray,np.ndarray]]:
+        """
+        Re-rank candidates found on approximate vectors by their exact distance and keep the top k
+
+        Args:
+              vectors: float32 array of shape (queries, dimension)
+              results: one (positions, approximate distances) pair per query
+              k: number of results to keep per query
+        Returns:
+              One (positions, squared L2 distances) pair of arrays per query, closest first
+        """
+        if self._exact is None or settings.FAISS_RESCORE_FACTOR<=0:
+            return results
+        rescored=[]
+        for vector,(positions,_) in zip(vectors,results):
+            distances=((self._vectors_at(positions)-vector)**2).sum(axis=1)
+            top=np.argsort(distances,kind="stable")[:k]
+            rescored.append((positions[top],distances[top]))
+        return rescored
+
+    def _vectors_at(self,positions:np.ndarray)->np.ndarray:
+        """
+        Read the vectors at some positions, exactly when the index stores approximations; caller holds the lock
+
+        Args:
+              positions: int64 array of positions
+        Returns:
+              Float32 array of shape (len(positions), dimension)
+        """
+        if self._exact is not None:
+            return np.asarray(self._exact[positions],dtype=np.float32)
+        return reconstruct_positions(self._vector_store.index,positions)
+
+    def _post_filtered(self,vectors:np.ndarray,k:int,metadata_filter:dict)->List[Tuple[np.ndarray,np.ndarray]]:
+        """
+        Filter with operators or unindexed fields the way LangChain does: search a wider candidate
+        list and keep the hits whose metadata passes
+
+        Args:
+              vectors: float32 array of shape (queries, dimension)
+              k: number of top results to keep per query
+              metadata_filter: LangChain-style filter dictionary
+        Returns:
+              One (positions, squared L2 distances) pair of arrays per query, closest first
+        """
+        store=self._vector_store
+        accepts=store._create_filter_func(metadata_filter)
+        distances,positions=store.index.search(vectors,max(4*k,20),params=self._live_params())
+        results=[]
+        for p,d in zip(positions,distances):
+            p,d=self._found(p,d)
+            keep=[
+                i for i,position in enumerate(p)
+                if accepts(store.docstore.search(store.index_to_docstore_id[int(position)]).metadata)
+            ][:k]
+            results.append((p[keep],d[keep]))
+        return results
+
+    def _live_params(self)->Optional[faiss.SearchParameters]:
+        """
+        Build search parameters excluding tombstoned positions; caller holds the lock
+
+        Args:
+              No arguments
+        Returns:
+              SearchParameters, or None when nothing is tombstoned
+        """
+        dead=self._dead_positions()
+        if len(dead)==0:
+            return None
+        return search_parameters(self._vector_store.index,faiss.IDSelectorNot(faiss.IDSelectorBatch(dead)))
+
+    @staticmethod
+    def _found(positions:np.ndarray,distances:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+        """
+        Drop the empty (-1) slots FAISS pads its results with
+
+        Args:
+              positions: FAISS positions
+              distances: matching distances
+        Returns:
+              Tuple of (positions, distances) without empty slots
+        """
+        hit=positions!=-1
+        return positions[hit].astype(np.int64),distances[hit]
+
+    def _documents(self,positions:np.ndarray,distances:np.ndarray)->List[Tuple[Document,float]]:
+        """
+        Fetch the documents stored at index positions
+
+        Args:
+              positions: FAISS positions
+              distances: matching distances
+        Returns:
+              List of (document, distance) pairs
+        """
+        store=self._vector_store
+        results=[]
+        for position,distance in zip(positions,distances):
+            _id=store.index_to_docstore_id[int(position)]
+            doc=store.docstore.search(_id)
+            if not isinstance(doc,Document):
+                raise ValueError(f"Could not find document for id {_id}, got {doc}")
+            results.append((doc,float(distance)))
+        return results
+
+    def keyword_search(
+        self,
+        query:str,
+        k:int=None,
+        metadata_filter:Optional[dict]=None,
+        score_threshold:Optional[float]=None
+    )->List[Tuple[Document,float]]:
+        """
+        Search the BM25 index, which finds exact terms such as model and dataset names that the
+        embedding may miss
+
+        Args:
+              query: search query
+              k: number of top results to retrieve
+              metadata_filter: optional metadata filter (e.g. {"title": "paper name"})
+              score_threshold: drop hits whose cosine similarity to the embedded query is below this,
+                    as dense search does (optional)
+        Returns:
+              List of (document, BM25 score) pairs, best first; empty without a keyword index
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        k=k or settings.TOP_K_RESULTS
+        query_vector=None
+        if score_threshold is not None:
+            query_vector=_unit(np.asarray(self.embedding_manager.embedding.embed_query(query),dtype=np.float32))
+        with self._lock:
+            if self._keywords is None:
+                return []
+            positions=self._keyword_rows()
+            mask=positions>=0
+            candidates=self.attribute_index.select(metadata_filter) if metadata_filter else None
+            if candidates is not None:
+                mask&=np.isin(positions,candidates)
+            post_filter=bool(metadata_filter) and candidates is None
+            rows,scores=self._keywords.search(query,max(4*k,20) if post_filter else k,mask)
+            hits=positions[rows]
+            if post_filter:
+                store=self._vector_store
+                accepts=store._create_filter_func(metadata_filter)
+                keep=[
+                    i for i,position in enumerate(hits)
+                    if accepts(store.docstore.search(store.index_to_docstore_id[int(position)]).metadata)
+                ][:k]
+                hits,scores=hits[keep],scores[keep]
+            if query_vector is not None and len(hits):
+                keep=_unit(self._vectors_at(hits))@query_vector>=score_threshold
+                hits,scores=hits[keep],scores[keep]
+            return self._documents(hits,scores)
+
+    def search(self,query:str,k:int=None,metadata_filter:Optional[dict]=None)->List[Document]:  
         """
         Search the vector store for similar documents
 
         Args:
               query: search query
               k: number of top results to retrieve
+              metadata_filter: optional metadata filter (e.g. {"title": "paper name"})
         Returns:
               List of document objects
         """
         if not self.is_initialized():
             raise ValueError("Vector store is not initialized")
         k=k or settings.TOP_K_RESULTS
-        results=self._vector_store.similarity_search(
-            query=query,
-            k=k
-        )
-        return results
+        vector=self.embedding_manager.embedding.embed_query(query)
+        return [doc for doc,_ in self._search_by_vector(vector,k,metadata_filter)]
+
+    def search_with_scores(
+        self,
+        query:str,
+        k:int=None,
+        metadata_filter:Optional[dict]=None,
+        score_threshold:Optional[float]=None,
+        mmr:bool=False,
+        fetch_k:int=None,
+        lambda_mult:float=None
+    )->List[Tuple[Document,float]]:
+        """
+        Search the vector store and score each hit by cosine similarity to the query; weak hits can be
+        dropped and the rest re-selected with maximal marginal relevance, so fewer, more diverse
+        chunks come back
+
+        Args:
+              query: search query
+              k: maximum number of results to return
+              metadata_filter: optional metadata filter (e.g. {"title": "paper name"})
+              score_threshold: drop hits whose similarity is below this (optional)
+              mmr: re-select the hits with maximal marginal relevance
+              fetch_k: number of nearest candidates MMR chooses from (default from settings)
+              lambda_mult: MMR trade-off, 1 for relevance only, 0 for diversity only (default from settings)
+        Returns:
+              List of (document, cosine similarity) pairs, best first
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        k=k or settings.TOP_K_RESULTS
+        fetch_k=max(fetch_k or settings.RETRIEVAL_FETCH_K,k) if mmr else k
+        lambda_mult=settings.RETRIEVAL_MMR_LAMBDA if lambda_mult is None else lambda_mult
+        vector=self.embedding_manager.embedding.embed_query(query)
+        return self._scored_by_vector(vector,k,metadata_filter,score_threshold,mmr,fetch_k,lambda_mult)
+
+    def _scored_by_vector(
+        self,
+        vector:np.ndarray,
+        k:int,
+        metadata_filter:Optional[dict],
+        score_threshold:Optional[float],
+        mmr:bool,
+        fetch_k:int,
+        lambda_mult:float
+    )->List[Tuple[Document,float]]:
+        """
+        Scored search with an embedded query; see search_with_scores
+
+        Args:
+              vector: query embedding
+              k: maximum number of results to return
+              metadata_filter: optional metadata filter
+              score_threshold: drop hits whose similarity is below this (optional)
+              mmr: re-select the hits with maximal marginal relevance
+              fetch_k: number of nearest candidates to score
+              lambda_mult: MMR trade-off
+        Returns:
+              List of (document, cosine similarity) pairs, best first
+        """
+        query_vector=np.asarray(vector,dtype=np.float32)
+        with self._lock:
+            positions,distances=self._nearest(query_vector.reshape(1,-1),fetch_k,metadata_filter)[0]
+            if len(positions)==0:
+                return []
+            query_vector=_unit(query_vector)
+            stored=_unit(self._vectors_at(positions))
+            similarities=stored@query_vector
+
+            keep=np.arange(len(positions))
+            if score_threshold is not None:
+                keep=keep[similarities>=score_threshold]
+            if mmr:
+                keep=keep[maximal_marginal_relevance(query_vector,stored[keep],k,lambda_mult)]
+            else:
+                keep=keep[:k]
+            documents=self._documents(positions[keep],distances[keep])
+        return [(doc,float(similarities[i])) for (doc,_),i in zip(documents,keep)]
+
+    def search_many(self,queries:List[str],k:int=None,metadata_filter:Optional[dict]=None)->List[List[Tuple[Document,float]]]:
+        """
+        Search for many queries at once: queries are embedded in one batch and searched as one matrix
+
+        Args:
+              queries: search queries
+              k: number of top results to retrieve per query
+              metadata_filter: optional metadata filter applied to every query
+        Returns:
+              One list of (document, squared L2 distance) pairs per query, closest first
+        """
+        if not self.is_initialized():
+            raise ValueError("Vector store is not initialized")
+        if not queries:
+            return []
+        k=k or settings.TOP_K_RESULTS
+        vectors=self.embedding_manager.embed_queries(queries)
+        return self._search_by_vectors(vectors,k,metadata_filter)
+    def exists(self,path:str=None)->bool:
+        """
+        Check whether an index has been saved
+
+        Args:
+              path: index directory (default FAISS_INDEX_PATH)
+        Returns:
+              True if the current version (or an unversioned index) exists there
+        """
+        return index_exists(Path(path or self.index_path))
+
     def save(self,path:str=None)->None:
         """
-        Save vector store to disk
+        Save vector store to disk as a new version: the FAISS index to index.faiss, chunk text,
+        metadata, the position -> id map and the tombstones to a SQLite docstore next to it. CURRENT
+        is switched to the version only once it is complete, so readers never see a partial index
 
         Args:
-              path: path to save the vector store
+              path: index directory (default FAISS_INDEX_PATH)
         Returns:
               None
         """
         if not self.is_initialized():
             raise ValueError("Vector store is not initialized")
-        path = path or self.index_path
-        os.makedirs(os.path.dirname(path),exist_ok=True)
-        self._vector_store.save_local(path)
+        root=Path(path or self.index_path)
+        version=new_version()
+        target=version_path(root,version)
+        target.mkdir(parents=True)
+
+        with self._lock:
+            store=self._vector_store
+            faiss.write_index(store.index,str(target/"index.faiss"))
+            if self._exact is not None:
+                np.save(target/VECTORS_FILE,self._exact)
+            if self._keywords is not None:
+                self._keywords.save(target/BM25_FILE)
+            docstore=SQLiteDocstore.write(target/DOCSTORE_FILE,store.docstore,store.index_to_docstore_id)
+            docstore.write_tombstones(sorted(self._tombstones))
+            docstore.commit()
+            docstore.close()
+            docstore=SQLiteDocstore(target/DOCSTORE_FILE,read_only=True)
+            publish(root,version)
+
+            # Serve from the new file from now on; the previous version stays as it was published
+            previous=store.docstore
+            store.docstore=docstore
+            store.index_to_docstore_id=docstore.id_map()
+            if isinstance(previous,SQLiteDocstore):
+                previous.close()
+            if self._mmap_path is not None:
+                self._mmap_path=target/"index.faiss"
+            if self._exact is not None:
+                # Leave the exact vectors on disk; only re-scored candidates are paged in
+                self._exact=np.load(target/VECTORS_FILE,mmap_mode="r")
+            self.version=version
+            self._loaded_root=root
+
+        # The first version supersedes an unversioned index in the root
+        for name in ("index.faiss","index.pkl",DOCSTORE_FILE):
+            legacy=root/name
+            if legacy.exists():
+                legacy.unlink()
+        prune(root)
 
-    def load(self,path:str=None)->FAISS:
+    def load(self,path:str=None,mmap:bool=None)->FAISS:
         """
-        Load vector store from disk
+        Load the current version of the vector store from disk; documents are read from the SQLite
+        docstore only when a search returns them
 
         Args:
-              path: path to load the vector store
+              path: index directory (default FAISS_INDEX_PATH)
+              mmap: map index.faiss read-only instead of reading it into the heap, so processes
+                    on one host share its page-cache pages (default from settings)
         Returns:
               FAISS vector store instance
         """
-        load_path = path or self.index_path
-        self._vector_store=FAISS.load_local(
-            load_path,
+        root=Path(path or self.index_path)
+        version=current_version(root)
+        load_path=version_path(root,version) if version else root
+        mmap = settings.FAISS_MMAP if mmap is None else mmap
+        index_file=load_path/"index.faiss"
+        flags=faiss.IO_FLAG_MMAP_IFC|faiss.IO_FLAG_READ_ONLY if mmap else 0
+
+        with self._lock:
+            if self._vector_store is not None and isinstance(self._vector_store.docstore,SQLiteDocstore):
+                self._vector_store.docstore.close()
+            self._reset_state()
+            self._mmap_path=index_file if mmap else None
+            self._loaded_root=root
+            if not (load_path/DOCSTORE_FILE).exists():
+                return self._load_legacy(load_path,flags)
+
+            # Versions are never modified after publishing; a writer switches to a working copy
+            docstore=SQLiteDocstore(load_path/DOCSTORE_FILE,read_only=True)
+            self._vector_store=FAISS(
+                self.embedding_manager.embedding,
+                apply_search_params(faiss.read_index(str(index_file),flags)),
+                docstore,
+                docstore.id_map()
+            )
+            self._tombstones=set(docstore.tombstones())
+            if (load_path/VECTORS_FILE).exists():
+                self._exact=np.load(load_path/VECTORS_FILE,mmap_mode="r")
+            if (load_path/BM25_FILE).exists():
+                self._keywords=BM25Index.load(load_path/BM25_FILE)
+            self.version=version
+            return self._vector_store
+
+    def reload_if_changed(self,mmap:bool=None)->bool:
+        """
+        Load the newly published version, if there is one, and swap it in; searches keep using the
+        loaded version until the new one is ready. Meant for processes that only read the index:
+        unsaved changes are dropped
+
+        Args:
+              mmap: map index.faiss read-only (default from settings)
+        Returns:
+              True if a new version was swapped in
+        """
+        root=self._loaded_root or self.index_path
+        version=current_version(root)
+        if version is None or version==self.version:
+            return False
+        fresh=VectorStoreManager(self.embedding_manager)
+        fresh.load(root,mmap=mmap)
+
+        with self._lock:
+            previous=self._vector_store
+            self._vector_store=fresh._vector_store
+            self._tombstones=fresh._tombstones
+            self._exact=fresh._exact
+            self._keywords=fresh._keywords
+            self._mmap_path=fresh._mmap_path
+            self.version=fresh.version
+            self._loaded_root=root
+            self._renumbered()
+            if previous is not None and isinstance(previous.docstore,SQLiteDocstore):
+                previous.docstore.close()
+        print(f"Vector store reloaded: version {self.version}")
+        return True
+
+    def _load_legacy(self,load_path:Path,flags:int=0)->FAISS:
+        """
+        Load an index saved in LangChain's pickle format, only with ALLOW_PICKLE_INDEX=true since
+        unpickling can run arbitrary code; the next save() migrates it
+
+        Args:
+              load_path: directory holding index.faiss and index.pkl
+              flags: faiss IO flags used to read index.faiss
+        Returns:
+              FAISS vector store instance
+        """
+        if not settings.ALLOW_PICKLE_INDEX:
+            raise ValueError(
+                f"{load_path} holds a pickled docstore (index.pkl), which is not loaded by default. "
+                "If you created this index yourself, run once with ALLOW_PICKLE_INDEX=true to load it "
+                "and save it again as SQLite; otherwise rebuild the index with prepare_pdf.py"
+            )
+        print(f"Loading pickled docstore from {load_path}; it is converted to {DOCSTORE_FILE} on the next save")
+        # Read the parts directly: load_local only takes io_flags in recent langchain-community releases
+        index=faiss.read_index(str(load_path/"index.faiss"),flags)
+        with open(load_path/"index.pkl","rb") as f:
+            docstore,index_to_docstore_id=pickle.load(f)
+        self._vector_store=FAISS(
             self.embedding_manager.embedding,
-            allow_dangerous_deserialization=True
+            apply_search_params(index),
+            docstore,
+            index_to_docstore_id
         )
         return self._vector_store
 
@@ -143,15 +1128,7 @@ class VectorStoreManager:
             raise ValueError("Vector store is not initialized")
 
         k = k or settings.TOP_K_RESULTS
-        search_kwargs = {"k": k}
-
-        if metadata_filter:
-            search_kwargs["filter"] = metadata_filter
-
-        return self._vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs=search_kwargs
-        )
+        return ManagerRetriever(manager=self, k=k, metadata_filter=metadata_filter or None)
 
     def clear(self)->None:
         """
@@ -162,4 +1139,6 @@ class VectorStoreManager:
         Returns:
               None
         """
-        self._vector_store=None
\ No newline at end of file
+        with self._lock:
+            self._vector_store=None
+            self._reset_state()
\ No newline at end of file
@@ -2,10 +2,9 @@
 
 from pathlib import Path
 
-from core.document_processing import DocumentProcessor
-from core.chunking import Chunking
-from core.meta_extraction import MetaExtraction
-from core.vector_store import VectorStoreManager
+from core.ingestion import IngestionPipeline
+from core.manifest import IngestionManifest
+from core.sharded_store import create_vector_store
 
 
 RAW_PDF_DIR = Path("data/raw_pdf")
@@ -26,7 +25,7 @@ def prepare_directories() -> None:
 
 def ingest_pdfs() -> None:
     """
-    Orchestrates the full PDF ingestion pipeline: processing, metadata extraction, chunking, and indexing
+    Orchestrates the staged PDF ingestion pipeline, only processing PDFs that are new or changed since the last run
 
     Args:
           No arguments
@@ -35,26 +34,49 @@ def ingest_pdfs() -> None:
     """
     prepare_directories()
 
-    vector_store = VectorStoreManager()
-
-    pdf_files = list(RAW_PDF_DIR.glob("*.pdf"))
+    pdf_files = sorted(RAW_PDF_DIR.glob("*.pdf"))
     if not pdf_files:
         raise RuntimeError("No PDF files found in data/raw_pdf")
 
-    for pdf_path in pdf_files:
-        processor = DocumentProcessor(path=str(pdf_path))
-        docs = processor.process()
-        pdf_metadata = processor.pdf_metadata
-
-        extractor = MetaExtraction(pdf_metadata, docs)
-        enriched_docs = extractor.update_metadata()  
-
-        chunker = Chunking(document=enriched_docs)
-        chunks = chunker.intiate_chunk()
-
-        vector_store.add_documents(chunks)
-
+    manifest = IngestionManifest()
+    vector_store = create_vector_store()
+    if not vector_store.exists():
+        # Without an index on disk every PDF has to be embedded again
+        manifest.clear()
+
+    plan = manifest.plan(pdf_files)
+    if plan.is_empty:
+        print(f"Index up to date ({len(pdf_files)} PDFs unchanged), nothing to ingest.")
+        return
+    print(
+        f"{len(plan.to_process)} PDFs to process ({len(plan.stale)} changed), "
+        f"{len(plan.removed)} removed, {len(pdf_files) - len(plan.to_process) - len(plan.duplicates)} unchanged"
+    )
+    for duplicate, original in plan.duplicates.items():
+        print(f"Skipping {duplicate}: same content as {original}")
+
+    if plan.rebuild:
+        manifest.clear()
+    else:
+        vector_store.load()
+        dropped = vector_store.mark_deleted(manifest.chunk_ids(plan.stale + plan.removed))
+        manifest.remove(plan.stale + plan.removed)
+        print(f"Marked {dropped} outdated chunks deleted in the existing index")
+
+    pipeline = IngestionPipeline(vector_store)
+    report = pipeline.run(plan.to_process, file_hashes=plan.hashes)
+    if not vector_store.is_initialized():
+        raise RuntimeError(f"No PDF could be ingested ({report['failed']} failed)")
+
+    for path, indexed in report["indexed"].items():
+        manifest.record(path, plan.hashes[path], indexed["chunk_ids"], indexed["paper_id"])
+
+    vector_store.wait_for_compaction()
+    # Trained index types are built once every vector is known, not from the first batch
+    vector_store.build_index()
+    vector_store.build_keyword_index()
     vector_store.save()
+    manifest.save()
 
 
 if __name__ == "__main__":
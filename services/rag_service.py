@@ -1,6 +1,33 @@
 from pathlib import Path
+import threading
 from core.chain import RAGChain
 from core.vector_store import VectorStoreManager
+from core.sharded_store import ShardedVectorStore, create_vector_store
+from core.index_versions import HotReloader
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def shared_vector_store() -> VectorStoreManager | ShardedVectorStore:
+    """
+    Loads the vector store once per process and keeps it in step with newly published index versions
+    on a background thread
+
+    Args:
+           No arguments
+    Returns:
+           Loaded vector store instance, shared by every caller in the process
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            vector_store = create_vector_store()
+            vector_store.load()
+            HotReloader(vector_store).start()
+            _shared_store = vector_store
+        return _shared_store
 
 
 class RAGService:
@@ -20,14 +47,15 @@ class RAGService:
         self.vector_store = self._load_vector_store()
         self.rag = RAGChain(self.vector_store)
 
-    def _load_vector_store(self) -> VectorStoreManager:
+    def _load_vector_store(self) -> VectorStoreManager | ShardedVectorStore:
         """
-        Checks for existing FAISS index and loads it into a VectorStoreManager
+        Checks for existing FAISS index and returns the process-wide VectorStoreManager (or
+        ShardedVectorStore when SHARD_KEY is set), which reloads itself when a new index is published
 
         Args:
                No arguments
         Returns:
-               Initialized VectorStoreManager instance
+               Initialized vector store instance
         """
         faiss_path = Path("data/faiss_index")
 
@@ -36,8 +64,7 @@ class RAGService:
                 "FAISS index not found. Ask admin to run prepare_pdf.py"
             )
 
-        vector_store = VectorStoreManager()
-        vector_store.load()
+        vector_store = shared_vector_store()
 
         if not vector_store.is_initialized():
             raise RuntimeError("Vector store failed to initialize")
@@ -79,12 +79,14 @@ def render_chat(scoped: bool = False):
         answer = result["answer"]
         sources = result.get("sources", [])
         sections_used = extract_sections(result.get("documents", []))
+        timings = result.get("timings", {})
 
     elif search_mode == "🌐 Web Search (Tavily)":
         web_context = tavily_tool.search(query)
         answer = rag_chain.generate(query=query, context=web_context)
         sources = ["Tavily Web Search"]
         sections_used = ["Web Search"]
+        timings = {}
 
     else:
         hybrid_results = hybrid_search.search(
@@ -102,6 +104,7 @@ def render_chat(scoped: bool = False):
             for doc in documents
         } | {"Tavily Web Search"})
         sections_used = extract_sections(documents)
+        timings = {}
 
     st.write(answer)
 
@@ -115,6 +118,9 @@ def render_chat(scoped: bool = False):
             for sec in sections_used:
                 st.write(f"- {sec}")
 
+    if timings:
+        st.caption(format_timings(timings))
+
 
 
 def extract_sections(documents):
@@ -131,4 +137,25 @@ def extract_sections(documents):
         section = doc.metadata.get("section")
         if section:
             sections.append(section)
-    return sorted(set(sections))
\ No newline at end of file
+    return sorted(set(sections))
+
+def format_timings(timings):
+    """
+    Formats the per-stage latency of a documents-only answer for display
+
+    Args:
+           timings: Dictionary of stage timings in ms, with reranking counts when reranking ran
+    Returns:
+           One-line summary string
+    """
+    parts = []
+    if "retrieve_ms" in timings:
+        parts.append(f"retrieval {timings['retrieve_ms']:.0f} ms")
+    if "rerank_ms" in timings:
+        parts.append(
+            f"rerank {timings['rerank_ms']:.0f} ms "
+            f"({timings['rerank_scored']}/{timings['rerank_candidates']} candidates)"
+        )
+    if "generate_ms" in timings:
+        parts.append(f"generation {timings['generate_ms']:.0f} ms")
+    return "⏱️ " + " · ".join(parts)
@@ -3,14 +3,15 @@ import streamlit as st
 from ui.dashboard import render_dashboard
 from ui.chat import render_chat
 from ui.Trends_And_Citations import render_trends_and_citations
-from core.vector_store import VectorStoreManager
+from services.rag_service import shared_vector_store
 from pathlib import Path
 import streamlit as st
 
 
 def init_vector_store():
     """
-    Initialize the vector store and load it into Streamlit's session state if not already present
+    Put the process-wide vector store into Streamlit's session state if not already present; it swaps
+    in newly published index versions on a background thread
 
     Args:
           No arguments
@@ -25,10 +26,8 @@ def init_vector_store():
         st.warning("⚠️ Vector store not found. Ask admin to run prepare_pdf.py.")
         return
 
-    vs = VectorStoreManager()
     try:
-        vs.load()
-        st.session_state.vector_store = vs
+        st.session_state.vector_store = shared_vector_store()
     except Exception as e:
         st.error(f"Failed to load vector store: {e}")
 